@@ -0,0 +1,81 @@
+"""Размер основной базы и латентность запросов до и после архивации.
+
+    python -m benchmarks.bench_archive --rows 2000000 --keep-days 365
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import measure, report, seed_transactions, temp_db_path
+from src.database import Database
+
+
+def run_queries(db: Database, user_id: int, repeat: int, label: str):
+    now = datetime.now()
+
+    def cold_stats(start_date):
+        # Без кэша статистики: иначе со второго повтора измеряется поиск в словаре
+        db._stats_cache.clear()
+        return db.get_statistics(user_id, start_date, now)
+
+    report(f"[{label}] add_transaction", measure(
+        lambda: db.add_transaction(user_id, 1, 100.0, 'бенчмарк', 'expense'), repeat
+    ))
+    report(f"[{label}] history (10)", measure(
+        lambda: db.get_user_transactions(user_id, limit=10), repeat
+    ))
+    report(f"[{label}] stats: месяц", measure(
+        lambda: cold_stats(now - timedelta(days=30)), repeat
+    ))
+    report(f"[{label}] stats: год", measure(
+        lambda: cold_stats(now - timedelta(days=365)), repeat
+    ))
+    report(f"[{label}] stats: все время", measure(
+        lambda: cold_stats(None), repeat
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--days', type=int, default=5 * 365)
+    parser.add_argument('--keep-days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    db = Database(temp_db_path())
+    with db.get_connection() as conn:
+        seed_transactions(conn, args.rows, users=args.users, days=args.days)
+    user_id = args.users // 2
+
+    print(f"Основная база до архивации: {os.path.getsize(db.db_name) / 2**20:.1f} MiB")
+    run_queries(db, user_id, args.repeat, 'до')
+
+    # Пакетами, как maintenance_job; самый долгий пакет — верхняя граница
+    # блокировки записи (каждый из двух шагов пакета — отдельная транзакция)
+    before = datetime.now() - timedelta(days=args.keep_days)
+    moved, after_id, longest = 0, 0, 0.0
+    started = time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        count, after_id = db.archive_transactions(before, after_id)
+        longest = max(longest, time.perf_counter() - batch_started)
+        if not count:
+            break
+        moved += count
+    archived = time.perf_counter() - started
+    started = time.perf_counter()
+    db.maintain()
+    print(f"Архивировано {moved} строк за {archived:.1f} s "
+          f"(самый долгий пакет {longest * 1000:.0f} ms), "
+          f"VACUUM/ANALYZE за {time.perf_counter() - started:.1f} s")
+
+    print(f"Основная база после: {os.path.getsize(db.db_name) / 2**20:.1f} MiB, "
+          f"архив: {os.path.getsize(db.archive_name) / 2**20:.1f} MiB")
+    run_queries(db, user_id, args.repeat, 'после')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Онлайн-копия и снимки: длительность и влияние на задержки бота.
+
+    python -m benchmarks.bench_backup --rows 500000
+
+Пока в фоновом потоке идет копия, основной поток непрерывно пишет
+(add_transaction) и читает (последние 10 записей); задержки сравниваются
+с теми же операциями без копии.
+"""
+import argparse
+import os
+import threading
+import time
+
+from benchmarks.common import temp_db_path, seed_transactions, report
+from src.backup import SnapshotStore, online_backup
+from src.database import Database
+
+
+def foreground(db: Database, until) -> tuple:
+    """Записи и чтения, пока until() не вернет True; задержки в мс"""
+    writes, reads = [], []
+    while not until():
+        started = time.perf_counter()
+        db.add_transaction(1, 1, 100.0, 'обед', 'expense')
+        writes.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        db.get_user_transactions(1, limit=10)
+        reads.append((time.perf_counter() - started) * 1000)
+    return writes, reads
+
+
+def with_background(db: Database, name: str, task):
+    """Выполнить task в фоновом потоке, измеряя задержки основного потока"""
+    result = {}
+
+    def run():
+        started = time.perf_counter()
+        result['value'] = task()
+        result['seconds'] = time.perf_counter() - started
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    writes, reads = foreground(db, lambda: not thread.is_alive())
+    thread.join()
+
+    print(f"\n{name}: {result['seconds']:.2f} s")
+    report('  запись во время копии', writes or [0])
+    report('  чтение во время копии', reads or [0])
+    return result['value']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--seconds', type=float, default=3.0, help='длительность замера без копии')
+    args = parser.parse_args()
+
+    db_name = temp_db_path()
+    db = Database(db_name)
+    with db.get_connection() as conn:
+        seed_transactions(conn, args.rows)
+    directory = os.path.dirname(db_name)
+    print(f"База {os.path.getsize(db_name) / 2**20:.1f} МБ, записей {args.rows}\n")
+
+    deadline = time.monotonic() + args.seconds
+    writes, reads = foreground(db, lambda: time.monotonic() > deadline)
+    report('запись без копии', writes)
+    report('чтение без копии', reads)
+
+    for pages, sleep in ((256, 0.005), (-1, 0)):
+        target = os.path.join(directory, f'copy_{pages}.db')
+        stats = with_background(db, f'копия по {pages} страниц, пауза {sleep * 1000:.0f} мс',
+                                lambda: online_backup(db_name, target, pages, sleep))
+        print(f"  шагов {stats['steps']}, перезапусков из-за записи {stats['restarts']}")
+
+    store = SnapshotStore(os.path.join(directory, 'backups'))
+    for label in ('снимок (первый, полный)', 'снимок (инкрементальный)'):
+        manifest = with_background(db, label, lambda: store.snapshot(db_name))
+        size = sum(f['size'] for f in manifest['files'].values())
+        stored = sum(f['stored_bytes'] for f in manifest['files'].values())
+        print(f"  размер {size / 2**20:.1f} МБ, записано {stored / 2**20:.2f} МБ")
+
+    started = time.perf_counter()
+    errors = store.verify(store.find())
+    print(f"\nПроверка снимка: {time.perf_counter() - started:.2f} s, "
+          f"{'ошибок нет' if not errors else errors}")
+
+
+if __name__ == '__main__':
+    main()
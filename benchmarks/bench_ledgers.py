@@ -0,0 +1,123 @@
+"""Общие учеты: история и статистика по индексу учета против запроса на участника.
+
+    python -m benchmarks.bench_ledgers --members 50 --ledger-rows 500000
+"""
+import argparse
+import heapq
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+
+from benchmarks.common import temp_db_path, seed_transactions, random_description, measure, report
+from src.database import Database
+
+
+def seed_ledger(db: Database, members: int, rows: int, days: int = 3 * 365, batch: int = 50_000) -> int:
+    """Учет с участниками 1..members и rows записями за days дней"""
+    rng = random.Random(7)
+    ledger = db.create_ledger(1, 'bench')
+    now = datetime.now()
+
+    with db.get_connection() as conn:
+        conn.executemany(
+            'INSERT OR IGNORE INTO ledger_members (ledger_id, user_id) VALUES (?, ?)',
+            [(ledger.id, user_id) for user_id in range(1, members + 1)]
+        )
+        categories = [row[0] for row in conn.execute("SELECT id FROM categories WHERE type = 'expense'")]
+        for start in range(0, rows, batch):
+            conn.executemany('''
+                INSERT INTO transactions (user_id, category_id, amount, description, type, date, ledger_id)
+                VALUES (?, ?, ?, ?, 'expense', ?, ?)
+            ''', [
+                (
+                    rng.randint(1, members),
+                    rng.choice(categories),
+                    round(rng.uniform(10, 5000), 2),
+                    random_description(rng),
+                    now - timedelta(seconds=rng.randint(0, days * 86400)),
+                    ledger.id,
+                )
+                for _ in range(min(batch, rows - start))
+            ])
+            conn.commit()
+
+    return ledger.id
+
+
+def history_per_member(db: Database, members, ledger_id: int, limit: int):
+    """Базовый вариант: запрос на каждого участника и слияние по дате"""
+    streams = []
+    for member in members:
+        rows = [t for t in db.get_user_transactions(member.id, limit=limit * 4) if t.ledger_id == ledger_id]
+        streams.append(rows[:limit])
+    return list(islice(heapq.merge(*streams, key=lambda t: t.date, reverse=True), limit))
+
+
+def stats_per_member(db: Database, members, ledger_id: int, start_date: datetime) -> dict:
+    """Базовый вариант: итоги учета по категориям отдельным запросом на каждого участника"""
+    totals = {}
+    with db.get_connection() as conn:
+        for member in members:
+            for category_id, total in conn.execute('''
+                SELECT category_id, SUM(amount) FROM transactions
+                WHERE user_id = ? AND ledger_id = ? AND date >= ?
+                GROUP BY category_id
+            ''', (member.id, ledger_id, start_date)):
+                totals[category_id] = totals.get(category_id, 0) + total
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--members', type=int, default=50)
+    parser.add_argument('--ledger-rows', type=int, default=500_000)
+    parser.add_argument('--personal-rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    db = Database(temp_db_path())
+    with db.get_connection() as conn:
+        seed_transactions(conn, args.personal_rows)
+    ledger_id = seed_ledger(db, args.members, args.ledger_rows)
+    with db.get_connection() as conn:
+        conn.execute('ANALYZE')
+
+    members = db.get_ledger_members(ledger_id)
+    month_ago = datetime.now().replace(second=0, microsecond=0) - timedelta(days=30)
+    print(f"Участников {len(members)}, записей в учете {args.ledger_rows}, "
+          f"личных записей {args.personal_rows}\n")
+
+    report('история: индекс учета',
+           measure(lambda: db.get_user_transactions(1, limit=10, ledger_id=ledger_id), args.repeat))
+    report('история: запрос на участника',
+           measure(lambda: history_per_member(db, members, ledger_id, 10), args.repeat))
+
+    def cold_stats():
+        db._stats_cache.clear()
+        return db.get_statistics(1, month_ago, ledger_id=ledger_id)
+
+    report('статистика за месяц: индекс учета',
+           measure(cold_stats, args.repeat))
+    report('статистика за месяц: запрос на участника',
+           measure(lambda: stats_per_member(db, members, ledger_id, month_ago), args.repeat))
+    report('статистика за месяц: из кэша',
+           measure(lambda: db.get_statistics(1, month_ago, ledger_id=ledger_id), args.repeat))
+
+    # Запись одного участника должна сбросить кэш у всех остальных
+    before = db.get_statistics(members[-1].id, month_ago, ledger_id=ledger_id)
+    writes = []
+
+    def write_and_read():
+        db.add_transaction(members[0].id, 1, 1.0, 'bench', 'expense', ledger_id=ledger_id)
+        writes.append(1)
+        return db.get_statistics(members[-1].id, month_ago, ledger_id=ledger_id)
+
+    report('запись + статистика другого участника', measure(write_and_read, args.repeat))
+    after = db.get_statistics(members[-1].id, month_ago, ledger_id=ledger_id)
+    ok = after['transaction_count'] == before['transaction_count'] + len(writes)
+    print(f"\nЗаписей до {before['transaction_count']}, после {after['transaction_count']}: "
+          f"{'кэш сброшен для всех участников' if ok else 'УСТАРЕВШИЙ КЭШ'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Накладные расходы UserUpdateProcessor, отсеченная им нагрузка и честность между пользователями.
+
+    python -m benchmarks.bench_middleware --users 200 --taps 20 --slots 4
+
+Слотов (--slots) меньше, чем обновлений в очереди: иначе не видно, занимают
+ли ожидающие своей очереди обновления общие слоты.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from telegram import CallbackQuery, Chat, Message, Update, User
+from telegram.ext import SimpleUpdateProcessor
+
+from benchmarks.common import report
+from src.middleware import UserUpdateProcessor
+
+
+def make_tap(update_id: int, user_id: int, data: str) -> Update:
+    user = User(user_id, 'bench', False)
+    return Update(update_id, callback_query=CallbackQuery(str(update_id), user, 'bench', data=data))
+
+
+def make_message(update_id: int, user_id: int, text: str) -> Update:
+    user = User(user_id, 'bench', False)
+    message = Message(update_id, datetime.now(), Chat(user_id, 'private'), from_user=user, text=text)
+    return Update(update_id, message=message)
+
+
+async def run(processor, updates, handler):
+    started = time.perf_counter()
+    await asyncio.gather(*(processor.process_update(u, handler(u)) for u in updates))
+    return time.perf_counter() - started
+
+
+async def main_async(args):
+    async def noop(update):
+        pass
+
+    # 1. Накладные расходы на обновление (обработчик ничего не делает)
+    updates = [make_message(i, i % args.users, str(i)) for i in range(args.overhead_updates)]
+    baseline = await run(SimpleUpdateProcessor(args.slots), updates, noop)
+    middleware = await run(UserUpdateProcessor(args.slots, rate_per_minute=1e9, burst=1e9), updates, noop)
+    per_update = (middleware - baseline) / len(updates) * 1e6
+    print(f"Накладные расходы: {per_update:.1f} мкс на обновление "
+          f"({baseline:.2f} s -> {middleware:.2f} s на {len(updates)})")
+
+    # 2. Дубли нажатий "📅 Сегодня": каждый пользователь жмет кнопку taps раз подряд
+    executed = 0
+
+    async def stats(update):
+        nonlocal executed
+        executed += 1
+        await asyncio.sleep(args.handler_ms / 1000)
+
+    taps = [make_tap(u * args.taps + i, u, 'stats_today')
+            for i in range(args.taps) for u in range(args.users)]
+    for name, processor in (('без middleware', SimpleUpdateProcessor(args.slots)),
+                            ('UserUpdateProcessor', UserUpdateProcessor(args.slots))):
+        executed = 0
+        elapsed = await run(processor, taps, stats)
+        extra = f", {processor.stats}" if isinstance(processor, UserUpdateProcessor) else ''
+        print(f"{name:<22} нажатий {len(taps)}, расчетов {executed}, {elapsed:.2f} s{extra}")
+
+    # 3. Флуд сообщениями: token bucket (по умолчанию 30/мин, burst 10)
+    flood = [make_message(u * args.flood + i, u, 'спам')
+             for i in range(args.flood) for u in range(args.users)]
+    processor = UserUpdateProcessor(args.slots)
+    elapsed = await run(processor, flood, noop)
+    print(f"Флуд: {len(flood)} сообщений, выполнено {processor.stats['processed']}, "
+          f"отсечено {processor.stats['throttled']} ({elapsed:.2f} s), "
+          f"корзин в памяти {len(processor.bucket)}")
+
+    # 4. Один занятый пользователь не должен задерживать остальных
+    finished = {}
+    started = time.perf_counter()
+
+    async def slow(update):
+        await asyncio.sleep(args.handler_ms / 1000)
+        finished[update.update_id] = (time.perf_counter() - started) * 1000
+
+    busy = [make_message(i, 0, str(i)) for i in range(args.busy)]
+    others = [make_message(args.busy + u, u, 'обед') for u in range(1, args.users + 1)]
+    processor = UserUpdateProcessor(args.slots, rate_per_minute=1e9, burst=1e9)
+    await run(processor, busy + others, slow)
+    print(f"\nЗанятый пользователь: {args.busy} обновлений по {args.handler_ms:.0f} мс, "
+          f"слотов {args.slots}, остальных пользователей {args.users}")
+    report('  ответ остальным', [finished[u.update_id] for u in others])
+    report('  ответ занятому', [finished[u.update_id] for u in busy])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--taps', type=int, default=20)
+    parser.add_argument('--flood', type=int, default=50)
+    parser.add_argument('--handler-ms', type=float, default=20)
+    parser.add_argument('--slots', type=int, default=4, help='max_concurrent_updates')
+    parser.add_argument('--busy', type=int, default=50, help='обновлений от одного занятого пользователя')
+    parser.add_argument('--overhead-updates', type=int, default=50_000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Быстрый ввод: разбор сообщения и проверка общих категорий после повторных запусков.
+
+    python -m benchmarks.bench_quick_add
+
+Проверяет, что повторная инициализация схемы не плодит общие категории
+(и сливает дубли, оставшиеся от прежних версий), а префиксы вроде "кв"
+по-прежнему находят категорию. Код возврата 1 при ошибке.
+"""
+import argparse
+import sys
+
+from benchmarks.common import measure, report, temp_db_path
+from src.database import Database
+from src.quick_add import CategoryIndex, parse_quick_entry
+
+# Количество общих категорий в _create_default_categories
+DEFAULT_CATEGORIES = 15
+
+MESSAGES = ['500 кв аренда', '250 ед обед', '+30000 зарплата', '120 такси домой', '90 🍔 кофе']
+
+
+def global_categories(db: Database) -> int:
+    with db.get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM categories WHERE user_id IS NULL').fetchone()[0]
+
+
+def resolve(db: Database, text: str):
+    type_, _, rest = parse_quick_entry(text)
+    return CategoryIndex(db.get_categories(user_id=1)).resolve(rest, type_)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10_000)
+    args = parser.parse_args()
+    failures = []
+
+    # Два запуска подряд (как главный процесс и процесс записи при WORKERS)
+    db_name = temp_db_path()
+    Database(db_name)
+    db = Database(db_name)
+    count = global_categories(db)
+    print(f"Общих категорий после двух запусков: {count}")
+    if count != DEFAULT_CATEGORIES:
+        failures.append(f"общих категорий {count}, ожидалось {DEFAULT_CATEGORIES}")
+
+    category, description = resolve(db, '500 кв аренда')
+    print(f"'500 кв аренда' -> {category.name if category else None}, описание '{description}'")
+    if category is None or category.name != 'Квартира' or description != 'аренда':
+        failures.append("'кв' не распознано как «Квартира»")
+
+    # База прежней версии: дубли общих категорий и запись, ссылающаяся на дубль
+    with db.get_connection() as conn:
+        conn.execute('DROP INDEX idx_categories_global')
+        conn.execute('''
+            INSERT INTO categories (name, emoji, type, user_id)
+            SELECT name, emoji, type, NULL FROM categories WHERE user_id IS NULL
+        ''')
+        duplicate = conn.execute("SELECT MAX(id) FROM categories WHERE name = 'Еда'").fetchone()[0]
+        conn.execute("INSERT INTO users (id, telegram_id, first_name) VALUES (1, 1, 'bench')")
+        conn.execute('''
+            INSERT INTO transactions (user_id, category_id, amount, description, type, date)
+            VALUES (1, ?, 250, 'обед', 'expense', CURRENT_TIMESTAMP)
+        ''', (duplicate,))
+
+    db = Database(db_name)
+    count = global_categories(db)
+    with db.get_connection() as conn:
+        kept = conn.execute('''
+            SELECT c.name FROM transactions t JOIN categories c ON c.id = t.category_id
+        ''').fetchone()
+    print(f"После слияния дублей: общих категорий {count}, запись в категории {kept[0] if kept else None}")
+    if count != DEFAULT_CATEGORIES or not kept or kept[0] != 'Еда':
+        failures.append("дубли общих категорий не слиты")
+
+    index = CategoryIndex(db.get_categories(user_id=1))
+    print()
+    for text in MESSAGES:
+        type_, _, rest = parse_quick_entry(text)
+        report(f"resolve '{text}'", measure(lambda: index.resolve(rest, type_), args.repeat))
+    report('построение индекса', measure(lambda: CategoryIndex(db.get_categories(user_id=1)), 100))
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
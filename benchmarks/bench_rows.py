@@ -0,0 +1,71 @@
+"""Память и время на выборку N транзакций: dict(row) против slotted-моделей.
+
+    python -m benchmarks.bench_rows --rows 100000
+"""
+import argparse
+import sqlite3
+import time
+import tracemalloc
+
+from benchmarks.common import seed_transactions, temp_db_path
+from src.database import Database
+
+
+def measure_peak(func):
+    """(результат, пиковая память в MiB, время в секундах)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2**20, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    db = Database(temp_db_path())
+    with db.get_connection() as conn:
+        seed_transactions(conn, args.rows, users=1)
+
+    def as_dicts():
+        # Прежний способ: sqlite3.Row -> dict на каждую строку, даты остаются строками
+        # (время не включает их разбор, который раньше делал каждый обработчик)
+        conn = sqlite3.connect(db.db_name)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f'''
+            SELECT t.*, c.name as category_name, c.emoji as category_emoji
+            FROM transactions t JOIN categories c ON t.category_id = c.id
+            WHERE t.user_id = 1 ORDER BY t.date DESC
+        ''').fetchall()
+        result = [dict(row) for row in rows]
+        conn.close()
+        return result
+
+    def as_models():
+        return db.get_user_transactions(1, limit=args.rows)
+
+    def streamed():
+        total = 0.0
+        for transaction in db.iter_user_transactions(1):
+            total += transaction.amount
+        return total
+
+    results = {}
+    for name, func in (('dict(row)', as_dicts), ('Transaction (slots)', as_models),
+                       ('iter_user_transactions', streamed)):
+        result, peak, elapsed = measure_peak(func)
+        results[name] = peak
+        print(f"{name:<24} пик {peak:8.1f} MiB  {elapsed * 1000:8.0f} ms")
+        del result
+
+    saved = results['dict(row)'] - results['Transaction (slots)']
+    print(f"Экономия на {args.rows} строк: {saved:.1f} MiB "
+          f"({saved * 2**20 / args.rows:.0f} байт на строку)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Латентность /search: FTS5-индекс против LIKE '%...%'.
+
+    python -m benchmarks.bench_search --rows 2000000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import measure, report, seed_transactions, temp_db_path
+from src.database import Database
+
+QUERIES = ['обед', 'кафе обед', 'елка', 'такс', 'суши кофе']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    db = Database(temp_db_path())
+    started = time.perf_counter()
+    with db.get_connection() as conn:
+        seed_transactions(conn, args.rows, users=args.users)
+    print(f"Заполнение {args.rows} строк (с триггерами FTS): "
+          f"{time.perf_counter() - started:.1f} s")
+
+    user_id = args.users // 2
+    month_ago = datetime.now() - timedelta(days=30)
+
+    for text in QUERIES:
+        report(f"fts  '{text}'", measure(
+            lambda: db.search_transactions(user_id, text, limit=10), args.repeat
+        ))
+        report(f"fts  '{text}' + 30 дней", measure(
+            lambda: db.search_transactions(user_id, text, limit=10, start_date=month_ago),
+            args.repeat
+        ))
+
+    # Страница 2 через keyset (score, id)
+    first = db.search_transactions(user_id, 'обед', limit=10)
+    if first:
+        after = (first[-1].score, first[-1].id)
+        report("fts  'обед' стр. 2 (keyset)", measure(
+            lambda: db.search_transactions(user_id, 'обед', limit=10, after=after),
+            args.repeat
+        ))
+
+    # Базовая линия: LIKE сканирует строки пользователя (без ранжирования — новые первыми).
+    # Соединение открывается на каждый запрос, как в боте (get_connection), —
+    # иначе в сравнение не попадает ~1.5 мс на открытие и ATTACH архива
+    def like(where: str, patterns: list):
+        with db.get_connection() as conn:
+            return conn.execute(
+                f'SELECT * FROM transactions WHERE user_id = ? AND {where} '
+                'ORDER BY date DESC LIMIT 10', [user_id, *patterns]
+            ).fetchall()
+
+    for text in QUERIES:
+        where = ' AND '.join(['lower(description) LIKE ?'] * len(text.split()))
+        patterns = [f'%{word}%' for word in text.split()]
+        report(f"like '{text}'", measure(lambda: like(where, patterns), max(1, args.repeat // 5)))
+
+    def connect_only():
+        with db.get_connection():
+            pass
+
+    report('get_connection (открытие + ATTACH)', measure(connect_only, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Время импорта по `python -X importtime` с бюджетом.
+
+    python -m benchmarks.bench_startup --budget-ms 30 --startup-budget-ms 800
+
+Проверяет, что:
+• `import src.bot` не тянет telegram/обработчики и не создает файлов (нет I/O при импорте);
+• холодный старт (все, что импортирует build_application) укладывается в бюджет;
+• редко используемые модули (поиск, обслуживание) не загружаются при старте.
+Код возврата 1 при нарушении — можно вызывать из CI или pre-commit.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые должны загружаться только по требованию
+DEFERRED = ('src.handlers.search', 'src.handlers.recurring', 'src.handlers.ledgers', 'src.jobs',
+            'src.workers', 'src.writer', 'src.backup')
+
+STARTUP_CODE = (
+    "import src.bot, src.database as d; d.get_db(); "
+    "src.bot.build_application('123456:TEST')"
+)
+
+
+def import_times(code: str, cwd: str, repeat: int):
+    """Лучшее по запускам время импорта: (мкс по модулям, модули верхнего уровня, мкс всего)"""
+    best, top, best_total = {}, set(), None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=cwd, capture_output=True, text=True,
+            env={**os.environ, 'PYTHONPATH': ROOT}
+        )
+        if result.returncode != 0:
+            raise SystemExit(result.stderr[-2000:])
+        total = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, raw_name = line[len('import time:'):].split('|')
+            name, cumulative = raw_name.strip(), int(cumulative)
+            # Вложенные импорты имеют больший отступ
+            if len(raw_name) - len(raw_name.lstrip()) == 1:
+                top.add(name)
+                total += cumulative
+            best[name] = min(best.get(name, cumulative), cumulative)
+        best_total = total if best_total is None else min(best_total, total)
+    return best, top, best_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--budget-ms', type=float, default=30,
+                        help='бюджет на `import src.bot`')
+    parser.add_argument('--startup-budget-ms', type=float, default=800,
+                        help='бюджет на импорты холодного старта')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    failures = []
+
+    with tempfile.TemporaryDirectory() as cwd:
+        times, _, _ = import_times('import src.bot', cwd, args.repeat)
+        bot_ms = times.get('src.bot', 0) / 1000
+        print(f"import src.bot: {bot_ms:.1f} ms (бюджет {args.budget_ms} ms)")
+        if bot_ms > args.budget_ms:
+            failures.append('import src.bot превышает бюджет')
+        heavy = [name for name in times if name.split('.')[0] == 'telegram' or name.startswith('src.handlers')]
+        if heavy:
+            failures.append(f"import src.bot загружает {', '.join(sorted(heavy)[:5])}")
+        if os.listdir(cwd):
+            failures.append(f"import src.bot создал файлы: {os.listdir(cwd)}")
+
+    with tempfile.TemporaryDirectory() as cwd:
+        times, top, total = import_times(STARTUP_CODE, cwd, args.repeat)
+        total_ms = total / 1000
+        print(f"холодный старт (импорты): {total_ms:.1f} ms (бюджет {args.startup_budget_ms} ms)")
+        for name in sorted(top, key=lambda name: -times[name])[:8]:
+            print(f"  {times[name] / 1000:8.1f} ms  {name}")
+        if total_ms > args.startup_budget_ms:
+            failures.append('холодный старт превышает бюджет')
+        loaded = [name for name in DEFERRED if name in times]
+        if loaded:
+            failures.append(f"при старте загружены отложенные модули: {', '.join(loaded)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
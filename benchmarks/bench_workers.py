@@ -0,0 +1,105 @@
+"""Пропускная способность бота в зависимости от числа воркеров (заглушка Bot API).
+
+    python -m benchmarks.bench_workers --users 200 --messages 20 --workers 0 1 2 4
+
+0 — обычный режим одним процессом, N >= 1 — WORKERS=N с процессом записи.
+Каждый пользователь отправляет /start, серию быстрых записей, /history
+и открывает статистику за месяц; время считается от первой выдачи
+getUpdates до последнего ответа бота.
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+
+from benchmarks.common import temp_db_path
+from benchmarks.stub_bot_api import StubBotAPI, message_update, callback_update
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_updates(users: int, messages: int):
+    """Обновления всех пользователей вперемешку; ответов ожидается users * (messages + 3)"""
+    scripts = []
+    for user_id in range(1, users + 1):
+        script = [('message', '/start')]
+        script += [('message', f'{100 + n} еда обед {n}') for n in range(messages)]
+        script += [('message', '/history'), ('callback', 'stats_month')]
+        scripts.append((user_id, script))
+
+    updates = []
+    for step in range(messages + 3):
+        for user_id, script in scripts:
+            kind, text = script[step]
+            build = message_update if kind == 'message' else callback_update
+            updates.append(build(len(updates) + 1, user_id, text))
+    return updates
+
+
+def run(workers: int, users: int, messages: int, timeout: float):
+    stub = StubBotAPI(make_updates(users, messages))
+    db_name = temp_db_path()
+    env = dict(
+        os.environ,
+        BOT_TOKEN='123456:stub',
+        BOT_API_URL=stub.start(),
+        DB_NAME=db_name,
+        WORKERS=str(workers),
+        LOG_LEVEL='WARNING',
+        # Нагрузка синтетическая — лимит запросов не должен срабатывать
+        RATE_LIMIT_PER_MINUTE='1000000',
+        RATE_LIMIT_BURST='1000000',
+    )
+    expected = users * (messages + 3)
+
+    bot = subprocess.Popen([sys.executable, '-m', 'src.bot'], cwd=ROOT, env=env)
+    try:
+        done = stub.wait_replies(expected, timeout)
+        elapsed = (stub.last_reply or 0) - (stub.first_delivery or 0)
+    finally:
+        bot.send_signal(signal.SIGINT)
+        try:
+            bot.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+        stub.stop()
+
+    label = 'один процесс' if workers == 0 else f'воркеров: {workers}'
+    if not done:
+        print(f"{label:<16} ответов {len(stub.replies)} из {expected} за {timeout:.0f} s — НЕ ЗАВЕРШЕНО")
+        return None
+
+    with sqlite3.connect(db_name) as conn:
+        saved = conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+    check = 'записи на месте' if saved == users * messages else f'ЗАПИСЕЙ {saved} из {users * messages}'
+
+    rate = expected / elapsed
+    print(f"{label:<16} ответов {expected:>7}  {elapsed:7.2f} s  {rate:8.0f} ответов/с  ({check})")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--timeout', type=float, default=600)
+    args = parser.parse_args()
+
+    print(f"Пользователей {args.users}, обновлений {args.users * (args.messages + 3)}, "
+          f"CPU: {os.cpu_count()}\n")
+    baseline = None
+    for workers in args.workers:
+        rate = run(workers, args.users, args.messages, args.timeout)
+        if rate and baseline is None:
+            baseline = rate
+        elif rate:
+            print(f"{'':<16} ускорение x{rate / baseline:.2f}")
+        time.sleep(0.5)
+
+
+if __name__ == '__main__':
+    main()
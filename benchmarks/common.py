@@ -0,0 +1,79 @@
+"""Общие утилиты для бенчмарков.
+
+Запуск из корня репозитория: python -m benchmarks.<имя> [--help]
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+WORDS = [
+    'обед', 'ужин', 'завтрак', 'кафе', 'ресторан', 'такси', 'метро', 'автобус',
+    'продукты', 'магазин', 'аптека', 'лекарства', 'кино', 'концерт', 'подарок',
+    'ёлка', 'квартира', 'аренда', 'коммуналка', 'интернет', 'телефон', 'книги',
+    'курсы', 'билеты', 'отель', 'бензин', 'парковка', 'кофе', 'пицца', 'суши',
+]
+
+
+def temp_db_path(name: str = 'bench.db') -> str:
+    """Путь к временному файлу базы (каталог удаляется ОС)"""
+    return os.path.join(tempfile.mkdtemp(prefix='finance_bench_'), name)
+
+
+def random_description(rng: random.Random) -> str:
+    """Случайное описание из 1-4 слов"""
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).capitalize()
+
+
+def seed_transactions(conn, rows: int, users: int = 1000, days: int = 3 * 365,
+                      seed: int = 42, batch: int = 50_000) -> None:
+    """Заполнить таблицу transactions синтетическими данными"""
+    rng = random.Random(seed)
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        'INSERT OR IGNORE INTO users (id, telegram_id, first_name) VALUES (?, ?, ?)',
+        [(i, i, 'bench') for i in range(1, users + 1)]
+    )
+
+    categories = [row[0] for row in cursor.execute(
+        "SELECT id FROM categories WHERE type = 'expense'"
+    )]
+    now = datetime.now()
+
+    for start in range(0, rows, batch):
+        cursor.executemany('''
+            INSERT INTO transactions (user_id, category_id, amount, description, type, date)
+            VALUES (?, ?, ?, ?, 'expense', ?)
+        ''', [
+            (
+                rng.randint(1, users),
+                rng.choice(categories),
+                round(rng.uniform(10, 5000), 2),
+                random_description(rng),
+                now - timedelta(seconds=rng.randint(0, days * 86400)),
+            )
+            for _ in range(min(batch, rows - start))
+        ])
+        conn.commit()
+
+
+def measure(func: Callable[[], object], repeat: int) -> List[float]:
+    """Время выполнения func в миллисекундах для каждого из repeat запусков"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(name: str, timings: List[float]) -> None:
+    """Печать p50/p95/max"""
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:<40} p50={statistics.median(ordered):8.2f} ms  "
+          f"p95={p95:8.2f} ms  max={ordered[-1]:8.2f} ms  (n={len(ordered)})")
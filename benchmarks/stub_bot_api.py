@@ -0,0 +1,219 @@
+"""Заглушка Bot API для локального запуска и нагрузочных тестов.
+
+    python -m benchmarks.stub_bot_api --port 8081
+    BOT_API_URL=http://127.0.0.1:8081 BOT_TOKEN=123:stub python -m src.bot
+
+Отвечает на getMe/getUpdates/sendMessage/editMessageText/... как Telegram,
+но без сети. Сообщение от пользователя можно отправить запросом
+    curl 'http://127.0.0.1:8081/_send?user=1&text=500%20еда%20обед'
+а ответы бота посмотреть в GET /_replies.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Методы, которые считаются ответом пользователю
+REPLY_METHODS = {'sendMessage', 'editMessageText'}
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    """Обновление с текстовым сообщением (команды размечаются как bot_command)"""
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}'},
+        'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
+
+
+def callback_update(update_id: int, user_id: int, data: str) -> dict:
+    """Обновление с нажатием inline-кнопки под сообщением бота"""
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'chat_instance': str(user_id),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}'},
+            'data': data,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': 1, 'is_bot': True, 'first_name': 'Stub'},
+                'text': '...',
+            },
+        },
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    # Воркеры открывают десятки соединений одновременно; по умолчанию очередь — 5
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class StubBotAPI:
+    """HTTP-сервер Bot API в фоновом потоке"""
+
+    def __init__(self, updates: List[dict] = (), host: str = '127.0.0.1', port: int = 0):
+        self._updates = list(updates)
+        self._update_ids = itertools.count(max((u['update_id'] for u in self._updates), default=0) + 1)
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Condition()
+        self.calls = {}
+        self.replies = []
+        self.first_delivery: Optional[float] = None
+        self.last_reply: Optional[float] = None
+        self._server = _Server((host, port), self._handler_class())
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def send(self, user_id: int, text: str):
+        """Добавить сообщение пользователя в очередь getUpdates"""
+        with self._lock:
+            self._updates.append(message_update(next(self._update_ids), user_id, text))
+            self._lock.notify_all()
+
+    def wait_replies(self, count: int, timeout: float) -> bool:
+        """Дождаться count ответов пользователю"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while len(self.replies) < count:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._lock.wait(left)
+        return True
+
+    # Методы Bot API
+    def get_updates(self, params: dict):
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+
+        with self._lock:
+            # Подтвержденные обновления (id < offset) больше не отдаются
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+            if not self._updates and timeout:
+                self._lock.wait(min(timeout, 1.0))
+            batch = self._updates[:limit]
+            if batch and self.first_delivery is None:
+                self.first_delivery = time.perf_counter()
+            return batch
+
+    def reply(self, method: str, params: dict):
+        chat_id = int(params.get('chat_id') or 0)
+        message = {
+            'message_id': int(params.get('message_id') or next(self._message_ids)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': 1, 'is_bot': True, 'first_name': 'Stub'},
+            'text': params.get('text', ''),
+        }
+        with self._lock:
+            self.replies.append((chat_id, params.get('text', '')))
+            self.last_reply = time.perf_counter()
+            self._lock.notify_all()
+        return message
+
+    def call(self, method: str, params: dict):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_bot',
+                    'can_join_groups': False, 'can_read_all_group_messages': False,
+                    'supports_inline_queries': False}
+        if method == 'getUpdates':
+            return self.get_updates(params)
+        if method in REPLY_METHODS:
+            return self.reply(method, params)
+        return True
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self, payload, status: int = 200):
+                body = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _params(self) -> dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length).decode() if length else ''
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    return json.loads(raw or '{}')
+
+                # PTB отправляет form-urlencoded, сложные значения — строками JSON
+                params = {}
+                for key, values in parse_qs(raw).items():
+                    try:
+                        params[key] = json.loads(values[0])
+                    except ValueError:
+                        params[key] = values[0]
+                return params
+
+            def do_POST(self):
+                method = urlparse(self.path).path.rsplit('/', 1)[-1]
+                self._respond({'ok': True, 'result': stub.call(method, self._params())})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == '/_send':
+                    stub.send(int(query.get('user', 1)), query.get('text', '/start'))
+                    self._respond({'ok': True})
+                elif url.path == '/_replies':
+                    self._respond({'ok': True, 'result': stub.replies[-50:], 'calls': stub.calls})
+                else:
+                    method = url.path.rsplit('/', 1)[-1]
+                    self._respond({'ok': True, 'result': stub.call(method, query)})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+
+    stub = StubBotAPI(host=args.host, port=args.port)
+    print(f"Bot API заглушка: {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+"""Резервные копии базы без остановки бота
+
+    python -m src.backup copy backup.db                 # разовая копия основной базы
+    python -m src.backup snapshot                       # снимок в BACKUP_DIR
+    python -m src.backup list
+    python -m src.backup verify [снимок]
+    python -m src.backup restore --at "2026-10-19 07:00" [--force]
+
+Копия снимается через backup API SQLite порциями по несколько страниц
+в фоновом потоке: между порциями база свободна для записи.
+
+Снимок — это копия основной базы и архива, разбитая на куски по CHUNK_SIZE.
+Куски хранятся сжатыми (gzip) под своим SHA-256, поэтому неизменившиеся
+куски не копируются повторно и снимки занимают место только под изменения.
+Манифест снимка перечисляет куски каждого файла. Восстановление на момент
+времени выбирает последний снимок, сделанный не позже этого момента.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+from typing import List, Optional
+
+from src.database import default_archive_name
+
+logger = logging.getLogger(__name__)
+
+# Страниц за шаг backup API и пауза между шагами
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.005
+
+# Сколько раз копия может начаться заново из-за записи в базу,
+# прежде чем копировать за один шаг (в WAL один шаг не блокирует запись)
+MAX_RESTARTS = 3
+
+# Размер куска снимка: кратен размеру страницы, поэтому изменение страницы
+# затрагивает ровно один кусок
+CHUNK_SIZE = 1024 * 1024
+
+# Уровень gzip для кусков: 1 примерно в 4 раза быстрее 6 при файле больше на ~15%,
+# а снимок снимается на работающем боте
+COMPRESS_LEVEL = 1
+
+# Сколько снимков хранить
+BACKUP_KEEP = 14
+
+
+class _Restarted(Exception):
+    """Копия началась заново слишком много раз"""
+
+
+def online_backup(source: str, target: str, pages: int = BACKUP_PAGES,
+                  sleep: float = BACKUP_SLEEP) -> dict:
+    """Согласованная копия файла базы source в target без остановки записи
+
+    Копирование идет шагами по pages страниц с паузой sleep между ними.
+    Если другой процесс пишет в базу во время копии, SQLite начинает
+    копию заново; после MAX_RESTARTS таких перезапусков оставшаяся копия
+    делается за один шаг. Возвращает статистику копии.
+    """
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0, 'seconds': 0.0}
+    remaining_before = None
+
+    def progress(status, remaining, total):
+        nonlocal remaining_before
+        stats['pages'] = total
+        stats['steps'] += 1
+        if remaining_before is not None and remaining > remaining_before:
+            stats['restarts'] += 1
+            if stats['restarts'] >= MAX_RESTARTS:
+                raise _Restarted()
+        remaining_before = remaining
+
+    started = time.perf_counter()
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        try:
+            src.backup(dst, pages=pages, progress=progress, sleep=sleep)
+        except _Restarted:
+            src.backup(dst)
+            stats['steps'] += 1
+    finally:
+        dst.close()
+        src.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _integrity_check(path: str) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+
+
+class SnapshotStore:
+    """Каталог снимков: snapshots/<имя>.json и chunks/<sha256[:2]>/<sha256>.gz"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.snapshots_dir = os.path.join(directory, 'snapshots')
+        self.chunks_dir = os.path.join(directory, 'chunks')
+        for path in (self.snapshots_dir, self.chunks_dir):
+            os.makedirs(path, exist_ok=True)
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunks_dir, digest[:2], f"{digest}.gz")
+
+    def _write_atomic(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _store_file(self, path: str) -> dict:
+        """Разбить файл на куски и сохранить новые; вернуть запись манифеста"""
+        chunks = []
+        stored = 0
+        whole = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+                whole.update(data)
+                digest = hashlib.sha256(data).hexdigest()
+                chunk_path = self._chunk_path(digest)
+                try:
+                    # Повторно использованный кусок помечаем свежим: иначе prune,
+                    # идущий параллельно, сочтет его старым и удалит
+                    os.utime(chunk_path)
+                except FileNotFoundError:
+                    compressed = gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+                    self._write_atomic(chunk_path, compressed)
+                    stored += len(compressed)
+                chunks.append(digest)
+
+        return {
+            'size': os.path.getsize(path),
+            'sha256': whole.hexdigest(),
+            'chunks': chunks,
+            'stored_bytes': stored,
+        }
+
+    def snapshot(self, db_name: str, archive_name: str = None,
+                 pages: int = BACKUP_PAGES, sleep: float = BACKUP_SLEEP) -> dict:
+        """Снять снимок основной базы и архива; вернуть манифест
+
+        Основная база копируется раньше архива: строки, перенесенные в архив
+        между двумя копиями, окажутся в обеих (следующая архивация уберет
+        дубль), но не потеряются.
+        """
+        created = datetime.now()
+        manifest = {'name': created.strftime('%Y%m%d-%H%M%S-%f'), 'created': created.isoformat(' '),
+                    'files': {}}
+
+        with tempfile.TemporaryDirectory(dir=self.directory) as tmp:
+            sources = (('main', db_name), ('archive', archive_name or default_archive_name(db_name)))
+            for key, source in sources:
+                copy = os.path.join(tmp, f"{key}.db")
+                stats = online_backup(source, copy, pages, sleep)
+                manifest['files'][key] = {**self._store_file(copy), 'backup': stats}
+
+        self._write_atomic(
+            os.path.join(self.snapshots_dir, f"{manifest['name']}.json"),
+            json.dumps(manifest, indent=1).encode()
+        )
+
+        stored = sum(f['stored_bytes'] for f in manifest['files'].values())
+        size = sum(f['size'] for f in manifest['files'].values())
+        logger.info(f"💾 Снимок {manifest['name']}: {size / 2**20:.1f} МБ, "
+                    f"новых данных {stored / 2**20:.1f} МБ")
+        return manifest
+
+    def list(self) -> List[dict]:
+        """Манифесты снимков от старых к новым"""
+        manifests = []
+        for name in sorted(os.listdir(self.snapshots_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.snapshots_dir, name)) as f:
+                    manifests.append(json.load(f))
+        return manifests
+
+    def find(self, name: str = None, at: datetime = None) -> Optional[dict]:
+        """Снимок по имени или последний, сделанный не позже at (по умолчанию — последний)"""
+        manifests = self.list()
+        if name:
+            return next((m for m in manifests if m['name'] == name), None)
+        if at:
+            manifests = [m for m in manifests if datetime.fromisoformat(m['created']) <= at]
+        return manifests[-1] if manifests else None
+
+    def _assemble(self, entry: dict, path: str):
+        """Собрать файл из кусков с проверкой хешей"""
+        with open(path, 'wb') as out:
+            for digest in entry['chunks']:
+                with open(self._chunk_path(digest), 'rb') as f:
+                    data = gzip.decompress(f.read())
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise ValueError(f"Поврежден кусок {digest}")
+                out.write(data)
+
+        if _sha256_file(path) != entry['sha256']:
+            raise ValueError(f"Контрольная сумма собранного файла не совпадает: {path}")
+
+    def verify(self, manifest: dict) -> List[str]:
+        """Проверить снимок: куски, контрольные суммы, PRAGMA integrity_check
+
+        Возвращает список ошибок (пустой — снимок цел).
+        """
+        errors = []
+        with tempfile.TemporaryDirectory(dir=self.directory) as tmp:
+            for key, entry in manifest['files'].items():
+                path = os.path.join(tmp, f"{key}.db")
+                try:
+                    self._assemble(entry, path)
+                except (OSError, ValueError) as e:
+                    errors.append(f"{key}: {e}")
+                    continue
+
+                result = _integrity_check(path)
+                if result != 'ok':
+                    errors.append(f"{key}: integrity_check: {result}")
+        return errors
+
+    def restore(self, manifest: dict, db_name: str, archive_name: str):
+        """Восстановить снимок в db_name и archive_name
+
+        Файлы собираются и проверяются во временном каталоге, затем
+        записываются в целевые базы через backup API (корректно и для баз
+        в режиме WAL). Бот на время восстановления нужно остановить.
+        """
+        with tempfile.TemporaryDirectory(dir=self.directory) as tmp:
+            targets = {'main': db_name, 'archive': archive_name}
+            paths = {}
+            for key, entry in manifest['files'].items():
+                paths[key] = os.path.join(tmp, f"{key}.db")
+                self._assemble(entry, paths[key])
+                result = _integrity_check(paths[key])
+                if result != 'ok':
+                    raise ValueError(f"{key}: integrity_check: {result}")
+
+            # Сначала все проверено — только потом перезаписываем базы
+            for key, path in paths.items():
+                src = sqlite3.connect(path)
+                dst = sqlite3.connect(targets[key])
+                try:
+                    src.backup(dst)
+                finally:
+                    dst.close()
+                    src.close()
+
+        logger.info(f"♻️ Восстановлен снимок {manifest['name']} ({manifest['created']})")
+
+    def prune(self, keep: int = BACKUP_KEEP) -> int:
+        """Оставить keep последних снимков и удалить куски, на которые никто не ссылается
+
+        Куски, записанные или повторно использованные после последнего снимка
+        (_store_file обновляет их mtime), не трогаются: они могут принадлежать
+        снимку, который сейчас создается. Возвращает число удаленных снимков.
+        """
+        manifests = self.list()
+        removed = manifests[:-keep] if keep > 0 else manifests
+        for manifest in removed:
+            os.remove(os.path.join(self.snapshots_dir, f"{manifest['name']}.json"))
+
+        kept = manifests[len(removed):]
+        referenced = {digest for m in kept for f in m['files'].values() for digest in f['chunks']}
+        newest = max((os.path.getmtime(os.path.join(self.snapshots_dir, f"{m['name']}.json"))
+                      for m in kept), default=0)
+
+        freed = 0
+        for prefix in os.listdir(self.chunks_dir):
+            prefix_dir = os.path.join(self.chunks_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                path = os.path.join(prefix_dir, name)
+                # Строго раньше: время файлов грубое (такт ядра), кусок, затронутый
+                # сразу после записи манифеста, может получить то же mtime
+                if name[:-3] not in referenced and os.path.getmtime(path) < newest:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+
+        if removed:
+            logger.info(f"🗑 Удалено снимков: {len(removed)}, освобождено {freed / 2**20:.1f} МБ")
+        return len(removed)
+
+
+def get_store() -> SnapshotStore:
+    """Хранилище снимков в BACKUP_DIR"""
+    return SnapshotStore(os.getenv('BACKUP_DIR', 'backups'))
+
+
+def main(argv: List[str] = None):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    copy = commands.add_parser('copy', help='разовая копия основной базы в файл')
+    copy.add_argument('target')
+
+    commands.add_parser('snapshot', help='снимок основной базы и архива')
+    commands.add_parser('list', help='список снимков')
+
+    verify = commands.add_parser('verify', help='проверить снимок (по умолчанию — все)')
+    verify.add_argument('name', nargs='?')
+
+    restore = commands.add_parser('restore', help='восстановить базу из снимка')
+    restore.add_argument('--snapshot', help='имя снимка (по умолчанию — последний)')
+    restore.add_argument('--at', type=datetime.fromisoformat,
+                         help='момент времени, например "2026-10-19 07:00"')
+    restore.add_argument('--force', action='store_true', help='перезаписать существующую базу')
+
+    prune = commands.add_parser('prune', help='удалить старые снимки')
+    prune.add_argument('--keep', type=int, default=int(os.getenv('BACKUP_KEEP', BACKUP_KEEP)))
+
+    args = parser.parse_args(argv)
+    db_name = os.getenv('DB_NAME', 'finance.db')
+
+    if args.command == 'copy':
+        stats = online_backup(db_name, args.target)
+        print(f"✅ {db_name} -> {args.target}: {stats['pages']} страниц за {stats['seconds']:.2f} s")
+        return 0
+
+    store = get_store()
+
+    if args.command == 'snapshot':
+        store.snapshot(db_name)
+        store.prune(int(os.getenv('BACKUP_KEEP', BACKUP_KEEP)))
+
+    elif args.command == 'list':
+        for m in store.list():
+            size = sum(f['size'] for f in m['files'].values())
+            stored = sum(f['stored_bytes'] for f in m['files'].values())
+            print(f"{m['name']}  {m['created'][:19]}  {size / 2**20:8.1f} МБ  "
+                  f"(новых {stored / 2**20:.1f} МБ)")
+
+    elif args.command == 'verify':
+        manifests = [store.find(args.name)] if args.name else store.list()
+        failed = False
+        for m in manifests:
+            if m is None:
+                print(f"❌ Снимок {args.name} не найден")
+                return 1
+            errors = store.verify(m)
+            failed |= bool(errors)
+            print(f"{'✅' if not errors else '❌'} {m['name']}" + ''.join(f"\n   {e}" for e in errors))
+        return 1 if failed else 0
+
+    elif args.command == 'restore':
+        manifest = store.find(args.snapshot, args.at)
+        if manifest is None:
+            print("❌ Подходящий снимок не найден")
+            return 1
+
+        if os.path.exists(db_name) and not args.force:
+            print(f"❌ {db_name} существует. Остановите бота и повторите с --force")
+            return 1
+
+        store.restore(manifest, db_name, default_archive_name(db_name))
+        print(f"✅ Восстановлен снимок {manifest['name']} ({manifest['created'][:19]})")
+
+    elif args.command == 'prune':
+        store.prune(args.keep)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
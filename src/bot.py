@@ -1,100 +1,207 @@
+"""Точка входа бота: python -m src.bot
+
+Модуль намеренно не делает ничего при импорте: переменные окружения,
+логирование, telegram.ext, обработчики и база данных загружаются в main().
+Редко используемые функции (поиск, повторяющиеся операции, общие учеты,
+задачи по расписанию) импортируются при первом обращении через lazy().
+
+WORKERS=N запускает N процессов-воркеров с отдельным процессом записи
+(см. src.workers).
+"""
 import os
 import sys
 import logging
-from dotenv import load_dotenv
-
-# Добавляем src в путь Python
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from importlib import import_module
 
-# Настройка логирования
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
-# Загружаем переменные
-load_dotenv()
-TOKEN = os.getenv('BOT_TOKEN')
 
-if not TOKEN:
-    logger.error("❌ Токен не найден!")
-    exit(1)
+def lazy(path: str):
+    """Обработчик или задача JobQueue, чей модуль импортируется при первом вызове
+
+    path — "модуль:функция", например "src.handlers.search:search_command".
+    """
+    module_name, func_name = path.split(':')
+    func = None
+
+    async def callback(*args):
+        nonlocal func
+        if func is None:
+            func = getattr(import_module(module_name), func_name)
+        return await func(*args)
+
+    callback.__name__ = func_name
+    return callback
+
+
+def setup_logging():
+    """Настройка логирования (в главном процессе, воркерах и процессе записи)"""
+    logging.basicConfig(
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s',
+        level=os.getenv('LOG_LEVEL', 'INFO')
+    )
+
 
-try:
+def bot_api_urls() -> dict:
+    """Адреса Bot API: BOT_API_URL — локальный сервер Bot API или заглушка для тестов"""
+    api_url = os.getenv('BOT_API_URL')
+    if not api_url:
+        return {}
+    return {'base_url': f"{api_url}/bot", 'base_file_url': f"{api_url}/file/bot"}
+
+
+def build_application(token: str, jobs: bool = True):
+    """Создать приложение и зарегистрировать обработчики
+
+    jobs=False — без задач по расписанию (их выполняет только один воркер).
+    """
+    from datetime import time as dtime
     from telegram.ext import (
         Application,
         CommandHandler,
         MessageHandler,
         CallbackQueryHandler,
         ConversationHandler,
-        filters,
-        ContextTypes
+        filters
     )
-    
-    # Относительные импорты (без src!)
-    from handlers.commands import (
-        start_command, help_command, stats_command,
-        settings_command, history_command
+    from src.handlers.commands import (
+        start_command, help_command, stats_command, history_command
     )
-    from handlers.expenses import (
+    from src.handlers.expenses import (
         start_add_transaction, category_selected,
         amount_received, description_received, cancel,
+        quick_add_received, undo_transaction,
         SELECTING_CATEGORY, ENTERING_AMOUNT, ENTERING_DESCRIPTION
     )
-    from handlers.statistics import handle_statistics_period, back_to_main
-    
-    from keyboards import get_main_keyboard
-    
-except ImportError as e:
-    logger.error(f"❌ Ошибка импорта: {e}")
-    exit(1)
+    from src.handlers.statistics import handle_statistics_period, back_to_main
+    from src.middleware import UserUpdateProcessor
+
+    # Обновления одного пользователя — по очереди, разных пользователей — параллельно
+    processor = UserUpdateProcessor(
+        max_concurrent_updates=int(os.getenv('MAX_CONCURRENT_UPDATES', '64')),
+        rate_per_minute=float(os.getenv('RATE_LIMIT_PER_MINUTE', '30')),
+        burst=int(os.getenv('RATE_LIMIT_BURST', '10'))
+    )
+    builder = Application.builder().token(token).concurrent_updates(processor)
+    urls = bot_api_urls()
+    if urls:
+        builder = builder.base_url(urls['base_url']).base_file_url(urls['base_file_url'])
+    app = builder.build()
+
+    # Команды
+    app.add_handler(CommandHandler("start", start_command))
+    app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("stats", stats_command))
+    app.add_handler(CommandHandler("history", history_command))
+    app.add_handler(CommandHandler("search", lazy('src.handlers.search:search_command')))
+    app.add_handler(CommandHandler("repeat", lazy('src.handlers.recurring:recurring_command')))
+    app.add_handler(CommandHandler("ledger", lazy('src.handlers.ledgers:ledger_command')))
+
+    # Conversation handlers
+    conv_expense = ConversationHandler(
+        entry_points=[
+            MessageHandler(filters.Regex('^➕ Добавить расход$'),
+                           lambda u, c: start_add_transaction(u, c, 'expense'))
+        ],
+        states={
+            SELECTING_CATEGORY: [CallbackQueryHandler(category_selected)],
+            ENTERING_AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, amount_received)],
+            ENTERING_DESCRIPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, description_received)]
+        },
+        fallbacks=[CommandHandler('cancel', cancel)]
+    )
+
+    app.add_handler(conv_expense)
+
+    # Быстрый ввод одним сообщением ("500 еда обед") — после диалога,
+    # чтобы сумма внутри диалога не перехватывалась
+    app.add_handler(MessageHandler(
+        filters.Regex(r'^\s*[+-]?\s*\d') & ~filters.COMMAND,
+        quick_add_received
+    ))
+    app.add_handler(CallbackQueryHandler(undo_transaction, pattern=r'^undo_\d+$'))
+
+    # Callback handlers
+    app.add_handler(CallbackQueryHandler(
+        lambda u, c: handle_statistics_period(u, c, u.callback_query.data.replace('stats_', '')),
+        pattern='^stats_(today|week|month|year|all)$'
+    ))
+    app.add_handler(CallbackQueryHandler(back_to_main, pattern='^back_to_main$'))
+    app.add_handler(CallbackQueryHandler(
+        lazy('src.handlers.search:search_more'), pattern='^search_more$'
+    ))
+    app.add_handler(CallbackQueryHandler(
+        lazy('src.handlers.recurring:recurring_delete'), pattern=r'^repeat_del_\d+$'
+    ))
+    app.add_handler(CallbackQueryHandler(
+        lazy('src.handlers.ledgers:ledger_selected'), pattern=r'^ledger_use_\d+$'
+    ))
+
+    # Задачи по расписанию (нужен python-telegram-bot[job-queue])
+    if app.job_queue and jobs:
+        app.job_queue.run_daily(
+            lazy('src.jobs:maintenance_job'),
+            time=dtime(hour=int(os.getenv('MAINTENANCE_HOUR', '4')))
+        )
+        app.job_queue.run_repeating(
+            lazy('src.jobs:recurring_job'),
+            interval=int(os.getenv('RECURRING_INTERVAL_MINUTES', '15')) * 60,
+            first=10
+        )
+        backup_hours = float(os.getenv('BACKUP_INTERVAL_HOURS', '0'))
+        if backup_hours > 0:
+            app.job_queue.run_repeating(
+                lazy('src.jobs:backup_job'),
+                interval=backup_hours * 3600,
+                first=60
+            )
+    elif jobs:
+        logger.warning("⚠️ JobQueue недоступна, обслуживание базы и повторяющиеся операции отключены")
+
+    return app
+
 
 def main():
+    from dotenv import load_dotenv
+
+    # Загружаем переменные
+    load_dotenv()
+    token = os.getenv('BOT_TOKEN')
+
+    # Настройка логирования
+    setup_logging()
+
+    if not token:
+        logger.error("❌ Токен не найден!")
+        sys.exit(1)
+
     logger.info("=" * 50)
     logger.info("🚀 ЗАПУСК ФИНАНСОВОГО БОТА")
-    logger.info(f"Токен: {TOKEN[:10]}...")
+    logger.info(f"Токен: {token[:10]}...")
     logger.info("=" * 50)
-    
+
     try:
-        app = Application.builder().token(TOKEN).build()
-        
-        # Команды
-        app.add_handler(CommandHandler("start", start_command))
-        app.add_handler(CommandHandler("help", help_command))
-        app.add_handler(CommandHandler("stats", stats_command))
-        app.add_handler(CommandHandler("history", history_command))
-        
-        # Conversation handlers
-        conv_expense = ConversationHandler(
-            entry_points=[
-                MessageHandler(filters.Regex('^➕ Добавить расход$'), 
-                             lambda u, c: start_add_transaction(u, c, 'expense'))
-            ],
-            states={
-                SELECTING_CATEGORY: [CallbackQueryHandler(category_selected)],
-                ENTERING_AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, amount_received)],
-                ENTERING_DESCRIPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, description_received)]
-            },
-            fallbacks=[CommandHandler('cancel', cancel)]
-        )
-        
-        app.add_handler(conv_expense)
-        
-        # Callback handlers
-        app.add_handler(CallbackQueryHandler(
-            lambda u, c: handle_statistics_period(u, c, 'today'),
-            pattern='^stats_today$'
-        ))
-        app.add_handler(CallbackQueryHandler(back_to_main, pattern='^back_to_main$'))
-        
+        from src.database import get_db
+
+        # Схема создается при старте, а не при обработке первого сообщения
+        get_db()
+
+        workers = int(os.getenv('WORKERS', '0'))
+        if workers > 0:
+            from src.workers import run_workers
+            run_workers(token, workers)
+            return
+
+        app = build_application(token)
+
         logger.info("✅ Бот запущен и готов к работе!")
         app.run_polling(drop_pending_updates=True)
-        
+
     except Exception as e:
         logger.error(f"❌ Ошибка: {e}")
         import traceback
         logger.error(traceback.format_exc())
 
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
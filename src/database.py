@@ -1,21 +1,200 @@
+import re
 import sqlite3
 import logging
-from datetime import datetime
-from typing import List, Tuple, Optional
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple, Optional
 from contextlib import contextmanager
+from functools import wraps
+from dateutil.relativedelta import relativedelta
+from src.models import (
+    User, Category, Transaction, RecurringRule, Ledger, CategoryTotal, columns, row_factory
+)
 
 logger = logging.getLogger(__name__)
 
+# Даты хранятся текстом ISO 8601 и читаются обратно как datetime
+# (через detect_types, без ручного strptime в обработчиках)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+# Слова запроса: буквы/цифры, без синтаксиса FTS5 (кавычки, NEAR, * и т.п.)
+_SEARCH_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+# Разделители слов в описаниях, которые заменяются пробелом перед индексацией:
+# каждое слово получает префикс пользователя, а токенизатор делит и по ним.
+# Список короткий: каждый символ — вложенный replace(), а глубина разбора
+# выражения в SQLite ограничена. Слово сразу после другого разделителя
+# (эмодзи, "%") попадает в индекс без префикса и поиском не находится
+_SEARCH_SEPARATORS = ',.;:!?()"\'/-_«»+—&#\n'
+
+
+def _normalize_sql(expr: str) -> str:
+    """SQL-выражение, приводящее «ё» к «е» (как и normalize_search_text)"""
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def _search_terms_sql(user_id: str, description: str) -> str:
+    """SQL-выражение для индексируемого текста: каждое слово как u<user_id>x<слово>
+
+    Пользователь входит в сам токен, поэтому FTS5 читает только его термы,
+    а не общий для всех пользователей список документов слова "обед".
+    """
+    text = _normalize_sql(description)
+    for char in _SEARCH_SEPARATORS:
+        text = f"replace({text}, {_quote_sql(char)}, ' ')"
+    prefix = f"'u' || {user_id} || 'x'"
+    return f"{prefix} || replace({text}, ' ', ' ' || {prefix})"
+
+
+def _quote_sql(text: str) -> str:
+    """Строковый литерал SQL"""
+    return "'" + text.replace("'", "''") + "'"
+
+
+def normalize_search_text(text: str) -> str:
+    """Нормализация текста для поиска"""
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def build_match_query(text: str, user_id: int) -> Optional[str]:
+    """Преобразовать пользовательский ввод в безопасный MATCH-запрос FTS5.
+    
+    Каждое слово ищется по префиксу ("обед" найдет "обеда", "обедом"),
+    все слова должны встречаться в описании.
+    """
+    tokens = _SEARCH_TOKEN_RE.findall(normalize_search_text(text).lower())
+    if not tokens:
+        return None
+    return ' '.join(f'"u{user_id}x{token}"*' for token in tokens)
+
+
+# Колонки транзакций в порядке хранения (одинаковы в основной и архивной базе)
+TRANSACTION_COLUMNS = 'id, user_id, category_id, amount, description, type, date, created_at, ledger_id'
+
+# Колонки для чтения в Transaction: поля таблицы + категория из JOIN
+TRANSACTION_SELECT = (
+    ', '.join(f't.{column.strip()}' for column in TRANSACTION_COLUMNS.split(','))
+    + ', c.name, c.emoji'
+)
+
+
+# Шаг повторяющейся операции (timedelta заметно быстрее relativedelta, где его достаточно)
+RECURRING_INTERVALS = {
+    'daily': lambda n: timedelta(days=n),
+    'weekly': lambda n: timedelta(weeks=n),
+    'monthly': lambda n: relativedelta(months=n),
+}
+
+
+# Записей за одну транзакцию materialize_recurring (~80 мкс на запись с триггерами):
+# BEGIN IMMEDIATE держится доли секунды, между пакетами успевают записи пользователей
+RECURRING_BATCH = 5_000
+
+# Строк за один вызов archive_transactions: каждый из двух шагов — короткая
+# транзакция, между пакетами успевают записи пользователей
+ARCHIVE_BATCH = 5_000
+
+# VACUUM основной базы, только когда свободные страницы составляют не меньше
+# этой доли файла: иначе место и так переиспользуется новыми записями, а ночной
+# VACUUM переписывает весь файл (и все блоки инкрементального снимка)
+VACUUM_FREE_RATIO = 0.25
+
+# Сколько соединение ждет чужую блокировку записи, секунд (по умолчанию sqlite3 — 5)
+BUSY_TIMEOUT = 30
+
+
+def recurring_occurrence(start_date: datetime, interval: str, n: int) -> datetime:
+    """Дата n-го повторения (n = 0 — сама start_date)
+    
+    Считается от start_date, а не от предыдущего повторения, поэтому
+    31-е число не "съезжает" на 28-е после февраля.
+    """
+    return start_date + RECURRING_INTERVALS[interval](n)
+
+
+# Сколько наборов статистики держать в памяти
+STATS_CACHE_SIZE = 1024
+
+
+def scope_condition(user_id: int, ledger_id: int = None, alias: str = '') -> Tuple[str, list]:
+    """Условие выборки: все записи пользователя или весь общий учет
+    
+    Личная область включает и записи, которые пользователь внес в общие учеты.
+    Для общего учета условие явно исключает NULL, иначе SQLite не сможет
+    использовать частичный индекс idx_transactions_ledger_date.
+    """
+    if ledger_id:
+        return f'{alias}ledger_id = ? AND {alias}ledger_id IS NOT NULL', [ledger_id]
+    return f'{alias}user_id = ?', [user_id]
+
+
+def month_start(date: datetime) -> datetime:
+    """Начало месяца"""
+    return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(date: datetime) -> datetime:
+    """Начало следующего месяца"""
+    start = month_start(date)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+def writes(batch: bool = True):
+    """Метод, изменяющий базу
+    
+    Если у базы задан writer (режим нескольких процессов), вызов передается
+    процессу записи и выполняется там. batch=False — метод сам управляет
+    транзакцией (COMMIT, VACUUM) и не объединяется с другими в один пакет.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.writer is not None:
+                return self.writer.call(method.__name__, args, kwargs)
+            return method(self, *args, **kwargs)
+        wrapper.batch = batch
+        return wrapper
+    return decorator
+
+
+def default_archive_name(db_name: str) -> str:
+    """Файл архива рядом с основной базой: finance.db -> finance_archive.db"""
+    root, ext = os.path.splitext(db_name)
+    return f"{root}_archive{ext or '.db'}"
+
+
 class Database:
-    def __init__(self, db_name: str = 'finance.db'):
+    def __init__(self, db_name: str = 'finance.db', archive_name: str = None, writer=None):
         self.db_name = db_name
-        self.init_database()
+        # Архив старых транзакций — отдельный файл рядом с основной базой
+        self.archive_name = archive_name or default_archive_name(db_name)
+        # Кэш статистики: ключ -> (версия области, результат)
+        self._stats_cache: OrderedDict = OrderedDict()
+        self._stats_lock = threading.Lock()
+        # Открытый пакет записи текущего потока (см. batch())
+        self._local = threading.local()
+        # Клиент процесса записи: методы @writes выполняются там, чтения — здесь
+        self.writer = writer
+        if writer is None:
+            # В режиме воркеров схему создает процесс записи
+            self.init_database()
     
     @contextmanager
     def get_connection(self):
         """Контекстный менеджер для соединения с БД"""
-        conn = sqlite3.connect(self.db_name)
+        batch = getattr(self._local, 'conn', None)
+        if batch is not None:
+            # Внутри пакета: общее соединение, COMMIT — в конце пакета
+            yield batch
+            return
+        
+        conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, detect_types=sqlite3.PARSE_DECLTYPES)
         conn.row_factory = sqlite3.Row
+        conn.execute('ATTACH DATABASE ? AS archive', (self.archive_name,))
         try:
             yield conn
             conn.commit()
@@ -26,9 +205,28 @@ class Database:
         finally:
             conn.close()
     
+    @contextmanager
+    def batch(self):
+        """Пакет записи: методы, вызванные внутри, выполняются одной транзакцией
+        
+        Один COMMIT (и один fsync) на весь пакет вместо одного на каждую запись.
+        Используется процессом записи (src.writer).
+        """
+        with self.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+    
     def init_database(self):
         """Инициализация базы данных"""
         with self.get_connection() as conn:
+            # WAL: чтения не блокируют запись и друг друга, в том числе из других процессов
+            conn.execute('PRAGMA main.journal_mode = WAL')
+            conn.execute('PRAGMA archive.journal_mode = WAL')
+            
             cursor = conn.cursor()
             
             # Пользователи
@@ -68,11 +266,39 @@ class Database:
                     type TEXT NOT NULL CHECK(type IN ('expense', 'income')),
                     date TIMESTAMP NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    ledger_id INTEGER REFERENCES ledgers(id) ON DELETE SET NULL,  -- NULL — личная запись
                     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
                     FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
                 )
             ''')
             
+            # Общие (семейные) учеты и их участники
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ledgers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    owner_id INTEGER NOT NULL,
+                    invite_code TEXT UNIQUE NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ledger_members (
+                    ledger_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (ledger_id, user_id),
+                    FOREIGN KEY (ledger_id) REFERENCES ledgers(id) ON DELETE CASCADE,
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+                ) WITHOUT ROWID
+            ''')
+            
+            # Колонки, появившиеся после первых версий схемы
+            self._add_column(cursor, 'users', 'active_ledger_id', 'INTEGER REFERENCES ledgers(id) ON DELETE SET NULL')
+            self._add_column(cursor, 'transactions', 'ledger_id', 'INTEGER REFERENCES ledgers(id) ON DELETE SET NULL')
+            
+
             # Бюджеты
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS budgets (
@@ -88,15 +314,195 @@ class Database:
                 )
             ''')
             
+            # Повторяющиеся операции (аренда, подписки, зарплата)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS recurring_transactions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    category_id INTEGER NOT NULL,
+                    amount REAL NOT NULL CHECK(amount > 0),
+                    description TEXT,
+                    type TEXT NOT NULL CHECK(type IN ('expense', 'income')),
+                    interval TEXT NOT NULL CHECK(interval IN ('daily', 'weekly', 'monthly')),
+                    start_date TIMESTAMP NOT NULL,
+                    occurrences INTEGER NOT NULL DEFAULT 0,
+                    next_due TIMESTAMP NOT NULL,
+                    active INTEGER NOT NULL DEFAULT 1,
+                    ledger_id INTEGER REFERENCES ledgers(id) ON DELETE CASCADE,
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                    FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
+                )
+            ''')
+            
             # Создаем индексы для ускорения запросов
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions(user_id, date)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_recurring_due ON recurring_transactions(next_due) WHERE active = 1')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_recurring_user ON recurring_transactions(user_id)')
+            self._add_column(cursor, 'recurring_transactions', 'ledger_id', 'INTEGER REFERENCES ledgers(id) ON DELETE CASCADE')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_ledger_members_user ON ledger_members(user_id)')
+            # Вся история общего учета — одним диапазоном индекса, без запроса на каждого участника
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_transactions_ledger_date
+                ON transactions(ledger_id, date) WHERE ledger_id IS NOT NULL
+            ''')
+            
+            # Помесячные итоги по заархивированным транзакциям
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS monthly_summaries (
+                    user_id INTEGER NOT NULL,
+                    month TEXT NOT NULL,  -- 'YYYY-MM'
+                    category_id INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    total REAL NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, month, category_id, type)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ledger_monthly_summaries (
+                    ledger_id INTEGER NOT NULL,
+                    month TEXT NOT NULL,  -- 'YYYY-MM'
+                    category_id INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    total REAL NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (ledger_id, month, category_id, type)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Архив: та же структура транзакций, id сохраняются
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archive.transactions (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    category_id INTEGER NOT NULL,
+                    amount REAL NOT NULL,
+                    description TEXT,
+                    type TEXT NOT NULL,
+                    date TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP,
+                    ledger_id INTEGER
+                )
+            ''')
+            self._add_column(cursor, 'transactions', 'ledger_id', 'INTEGER', schema='archive')
+            cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_transactions_user_date ON transactions(user_id, date)')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS archive.idx_transactions_ledger_date
+                ON transactions(ledger_id, date) WHERE ledger_id IS NOT NULL
+            ''')
+            
+            # Версии данных для кэша статистики: любая запись в транзакции
+            # увеличивает версию автора и общего учета (то есть сразу всех участников)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_versions (
+                    scope TEXT NOT NULL,  -- 'user' или 'ledger'
+                    scope_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (scope, scope_id)
+                ) WITHOUT ROWID
+            ''')
+            self._create_stats_triggers(cursor)
+            
+            # Полнотекстовый поиск по описаниям
+            self._create_search_index(cursor)
+            self._create_search_index(cursor, schema='archive')
             
             # Добавляем стандартные категории, если их нет
             self._create_default_categories(cursor)
             
             logger.info("✅ База данных инициализирована")
     
+    @staticmethod
+    def _add_column(cursor, table: str, column: str, definition: str, schema: str = 'main'):
+        """Добавить колонку в существующую таблицу, если ее еще нет"""
+        cursor.execute(f'PRAGMA {schema}.table_info({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {schema}.{table} ADD COLUMN {column} {definition}')
+    
+    def _create_stats_triggers(self, cursor):
+        """Триггеры, увеличивающие версии статистики при изменении транзакций"""
+        def bump(row: str) -> str:
+            return f'''
+                INSERT INTO stats_versions (scope, scope_id, version) VALUES ('user', {row}.user_id, 1)
+                ON CONFLICT (scope, scope_id) DO UPDATE SET version = version + 1;
+                INSERT INTO stats_versions (scope, scope_id, version)
+                SELECT 'ledger', {row}.ledger_id, 1 WHERE {row}.ledger_id IS NOT NULL
+                ON CONFLICT (scope, scope_id) DO UPDATE SET version = version + 1;
+            '''
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS stats_version_insert AFTER INSERT ON transactions BEGIN
+                {bump('new')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS stats_version_delete AFTER DELETE ON transactions BEGIN
+                {bump('old')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS stats_version_update AFTER UPDATE ON transactions BEGIN
+                {bump('old')}
+                {bump('new')}
+            END
+        ''')
+    
+    def _create_search_index(self, cursor, schema: str = 'main'):
+        """FTS5-индекс по описаниям транзакций (external content + триггеры)"""
+        cursor.execute(
+            f"SELECT sql FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'transactions_fts'"
+        )
+        row = cursor.fetchone()
+        if row is not None and 'owner' in row[0]:
+            # Прежняя схема: пользователь в отдельной колонке owner. Она не сужала
+            # поиск — FTS5 все равно читал общий для всех список документов слова
+            for trigger in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {schema}.transactions_fts_{trigger}')
+            cursor.execute(f'DROP TABLE {schema}.transactions_fts')
+            cursor.execute(f'DROP VIEW IF EXISTS {schema}.transactions_search')
+            row = None
+        exists = row is not None
+        
+        # Индексируются слова с префиксом пользователя (см. _search_terms_sql);
+        # unicode61 не сворачивает «ё» в «е», поэтому текст нормализуется заранее
+        cursor.execute(f'''
+            CREATE VIEW IF NOT EXISTS {schema}.transactions_search AS
+            SELECT id, {_search_terms_sql('user_id', 'description')} AS terms
+            FROM transactions
+        ''')
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.transactions_fts USING fts5(
+                terms,
+                content='transactions_search',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+        
+        old_terms = _search_terms_sql('old.user_id', 'old.description')
+        new_terms = _search_terms_sql('new.user_id', 'new.description')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.transactions_fts_insert AFTER INSERT ON transactions BEGIN
+                INSERT INTO transactions_fts (rowid, terms) VALUES (new.id, {new_terms});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.transactions_fts_delete AFTER DELETE ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, terms) VALUES ('delete', old.id, {old_terms});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.transactions_fts_update AFTER UPDATE OF description, user_id ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, terms) VALUES ('delete', old.id, {old_terms});
+                INSERT INTO transactions_fts (rowid, terms) VALUES (new.id, {new_terms});
+            END
+        ''')
+        
+        # Для уже существующей базы строим индекс по имеющимся записям
+        if not exists:
+            cursor.execute(f"INSERT INTO {schema}.transactions_fts (transactions_fts) VALUES ('rebuild')")
+    
     def _create_default_categories(self, cursor):
         """Создание стандартных категорий"""
         default_categories = [
@@ -119,6 +525,15 @@ class Database:
             ('💎 Другое', 'income')
         ]
         
+        # UNIQUE(name, user_id) не защищает общие категории: NULL не равен NULL,
+        # и раньше каждый запуск добавлял их заново. Сливаем дубли и закрываем
+        # частичным уникальным индексом, после этого INSERT OR IGNORE работает
+        self._merge_duplicate_categories(cursor)
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_categories_global
+            ON categories(name, type) WHERE user_id IS NULL
+        ''')
+        
         for name, type_ in default_categories:
             emoji, category_name = name.split(' ', 1)
             cursor.execute('''
@@ -126,18 +541,60 @@ class Database:
                 VALUES (?, ?, ?, NULL)
             ''', (category_name, emoji, type_))
     
+    @staticmethod
+    def _merge_duplicate_categories(cursor):
+        """Перенести ссылки с дублей общих категорий на самую раннюю и удалить дубли"""
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS category_remap (
+                duplicate INTEGER PRIMARY KEY,
+                keep INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('DELETE FROM category_remap')
+        cursor.execute('''
+            INSERT INTO category_remap (duplicate, keep)
+            SELECT c.id, first.id
+            FROM categories c
+            JOIN (SELECT MIN(id) AS id, name, type FROM categories
+                  WHERE user_id IS NULL GROUP BY name, type) first
+              ON first.name = c.name AND first.type = c.type
+            WHERE c.user_id IS NULL AND c.id <> first.id
+        ''')
+        if not cursor.rowcount:
+            return
+        
+        remap = '(SELECT keep FROM category_remap WHERE duplicate = category_id)'
+        duplicates = 'category_id IN (SELECT duplicate FROM category_remap)'
+        for table in ('transactions', 'archive.transactions', 'budgets', 'recurring_transactions'):
+            cursor.execute(f'UPDATE {table} SET category_id = {remap} WHERE {duplicates}')
+        
+        # В помесячных итогах категория входит в ключ — суммируем в строку оставшейся
+        for table, scope in (('monthly_summaries', 'user_id'), ('ledger_monthly_summaries', 'ledger_id')):
+            cursor.execute(f'''
+                INSERT INTO {table} ({scope}, month, category_id, type, total, count)
+                SELECT {scope}, month, {remap}, type, total, count FROM {table} WHERE {duplicates}
+                ON CONFLICT ({scope}, month, category_id, type)
+                DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+            ''')
+            cursor.execute(f'DELETE FROM {table} WHERE {duplicates}')
+        
+        cursor.execute('DELETE FROM categories WHERE id IN (SELECT duplicate FROM category_remap)')
+        logger.info(f"🧹 Удалено дублей общих категорий: {cursor.rowcount}")
+    
     # Методы для работы с пользователями
-    def get_or_create_user(self, telegram_id: int, username: str, first_name: str) -> dict:
+    @writes()
+    def get_or_create_user(self, telegram_id: int, username: str, first_name: str) -> User:
         """Получить или создать пользователя"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = row_factory(User)
             
             # Проверяем существующего пользователя
-            cursor.execute('SELECT * FROM users WHERE telegram_id = ?', (telegram_id,))
+            cursor.execute(f'SELECT {columns(User)} FROM users WHERE telegram_id = ?', (telegram_id,))
             user = cursor.fetchone()
             
             if user:
-                return dict(user)
+                return user
             
             # Создаем нового пользователя
             cursor.execute('''
@@ -146,113 +603,624 @@ class Database:
             ''', (telegram_id, username, first_name))
             
             user_id = cursor.lastrowid
-            cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-            return dict(cursor.fetchone())
+            cursor.execute(f'SELECT {columns(User)} FROM users WHERE id = ?', (user_id,))
+            return cursor.fetchone()
     
     # Методы для работы с транзакциями
+    @writes()
     def add_transaction(self, user_id: int, category_id: int, amount: float, 
-                       description: str, type_: str, date: datetime = None) -> int:
-        """Добавить транзакцию"""
+                       description: str, type_: str, date: datetime = None,
+                       ledger_id: int = None) -> int:
+        """Добавить транзакцию (ledger_id — в общий учет, иначе личная)"""
         if date is None:
             date = datetime.now()
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO transactions (user_id, category_id, amount, description, type, date)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (user_id, category_id, amount, description, type_, date))
+                INSERT INTO transactions (user_id, category_id, amount, description, type, date, ledger_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, category_id, amount, description, type_, date, ledger_id))
             
             return cursor.lastrowid
     
-    def get_user_transactions(self, user_id: int, limit: int = 100, 
-                             start_date: datetime = None, end_date: datetime = None) -> List[dict]:
-        """Получить транзакции пользователя"""
+    @writes()
+    def delete_transaction(self, transaction_id: int, user_id: int) -> bool:
+        """Удалить транзакцию пользователя"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            query = '''
-                SELECT t.*, c.name as category_name, c.emoji as category_emoji
-                FROM transactions t
-                JOIN categories c ON t.category_id = c.id
-                WHERE t.user_id = ?
-            '''
-            params = [user_id]
+            cursor.execute(
+                'DELETE FROM transactions WHERE id = ? AND user_id = ?',
+                (transaction_id, user_id)
+            )
+            return cursor.rowcount > 0
+    
+    def iter_user_transactions(self, user_id: int, start_date: datetime = None,
+                               end_date: datetime = None, limit: int = None,
+                               ledger_id: int = None) -> Iterator[Transaction]:
+        """Транзакции пользователя или общего учета (включая архив) от новых к старым, лениво
+        
+        Основная и архивная части читаются по индексу (user_id, date) или
+        (ledger_id, date) и сливаются SQLite без сортировки во временной таблице,
+        поэтому строки отдаются по мере чтения. Соединение открыто, пока
+        итератор не исчерпан или не закрыт.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory(Transaction)
+            conditions, params = scope_condition(user_id, ledger_id, 't.')
             
             if start_date:
-                query += ' AND t.date >= ?'
+                conditions += ' AND t.date >= ?'
                 params.append(start_date)
             
             if end_date:
-                query += ' AND t.date <= ?'
+                conditions += ' AND t.date <= ?'
                 params.append(end_date)
             
-            query += ' ORDER BY t.date DESC LIMIT ?'
-            params.append(limit)
+            query = ' UNION ALL '.join(f'''
+                SELECT {TRANSACTION_SELECT}
+                FROM {schema}.transactions t
+                JOIN categories c ON t.category_id = c.id
+                WHERE {conditions}
+            ''' for schema in ('main', 'archive')) + ' ORDER BY date DESC'
+            params = params * 2
+            
+            if limit is not None:
+                query += ' LIMIT ?'
+                params.append(limit)
             
             cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+            yield from cursor
+    
+    def get_user_transactions(self, user_id: int, limit: int = 100, 
+                             start_date: datetime = None, end_date: datetime = None,
+                             ledger_id: int = None) -> List[Transaction]:
+        """Получить транзакции пользователя или общего учета (включая архив)"""
+        return list(self.iter_user_transactions(user_id, start_date, end_date, limit, ledger_id))
     
     def get_statistics(self, user_id: int, start_date: datetime = None, 
-                      end_date: datetime = None) -> dict:
-        """Получить статистику по пользователю"""
+                      end_date: datetime = None, ledger_id: int = None) -> dict:
+        """Получить статистику по пользователю или по общему учету
+        
+        Заархивированные полные месяцы берутся из monthly_summaries
+        (ledger_monthly_summaries), неполные месяцы на границах периода — из
+        архивных транзакций.
+        
+        Результат кэшируется по области (пользователь или учет) и периоду.
+        Запись хранит версию области из stats_versions; триггеры увеличивают
+        ее при любом изменении транзакций, поэтому запись одного участника
+        сбрасывает кэш общего учета сразу для всех.
+        """
+        scope = ('ledger', ledger_id) if ledger_id else ('user', user_id)
+        key = (*scope, start_date, end_date)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Версию читаем до расчета: если запись случится во время расчета,
+            # результат сохранится под старой версией и будет пересчитан
+            cursor.execute(
+                'SELECT version FROM stats_versions WHERE scope = ? AND scope_id = ?', scope
+            )
+            row = cursor.fetchone()
+            version = row[0] if row else 0
+            
+            with self._stats_lock:
+                cached = self._stats_cache.get(key)
+                if cached and cached[0] == version:
+                    self._stats_cache.move_to_end(key)
+                    return cached[1]
+            
+            stats = self._compute_statistics(cursor, user_id, ledger_id, start_date, end_date)
+        
+        with self._stats_lock:
+            self._stats_cache[key] = (version, stats)
+            self._stats_cache.move_to_end(key)
+            if len(self._stats_cache) > STATS_CACHE_SIZE:
+                self._stats_cache.popitem(last=False)
+        
+        return stats
+    
+    def _compute_statistics(self, cursor, user_id: int, ledger_id: int = None,
+                            start_date: datetime = None, end_date: datetime = None) -> dict:
+        """Расчет статистики без кэша (см. get_statistics)"""
+        hot_where, hot_params = scope_condition(user_id, ledger_id)
+        
+        if start_date:
+            hot_where += ' AND date >= ?'
+            hot_params.append(start_date)
+        
+        if end_date:
+            hot_where += ' AND date <= ?'
+            hot_params.append(end_date)
+        
+        archive_where, archive_params, summary_where, summary_params = \
+            self._archive_conditions(start_date, end_date)
+        scope_where, scope_params = scope_condition(user_id, ledger_id)
+        if ledger_id:
+            summaries, summary_scope, scope_id = 'ledger_monthly_summaries', 'ledger_id', ledger_id
+        else:
+            summaries, summary_scope, scope_id = 'monthly_summaries', 'user_id', user_id
+        
+        cursor.execute(f'''
+            WITH rows (category_id, type, amount, count) AS (
+                SELECT category_id, type, amount, 1
+                FROM main.transactions WHERE {hot_where}
+                UNION ALL
+                SELECT category_id, type, amount, 1
+                FROM archive.transactions WHERE {scope_where} AND ({archive_where})
+                UNION ALL
+                SELECT category_id, type, total, count
+                FROM {summaries} WHERE {summary_scope} = ? AND ({summary_where})
+            )
+            SELECT c.name, c.emoji, r.type, SUM(r.amount) as total, SUM(r.count) as count
+            FROM rows r
+            JOIN categories c ON r.category_id = c.id
+            GROUP BY r.category_id, r.type
+            ORDER BY total DESC
+        ''', [*hot_params, *scope_params, *archive_params, scope_id, *summary_params])
+        rows = cursor.fetchall()
+        
+        expenses = [row for row in rows if row['type'] == 'expense']
+        income = [row for row in rows if row['type'] == 'income']
+        
+        return {
+            'total_expenses': sum(row['total'] for row in expenses) if expenses else None,
+            'total_income': sum(row['total'] for row in income) if income else None,
+            'transaction_count': sum(row['count'] for row in rows),
+            # Статистика по категориям (только расходы)
+            'categories': [
+                CategoryTotal(row['name'], row['emoji'], row['total'])
+                for row in expenses
+            ]
+        }
+
+    @staticmethod
+    def _archive_conditions(start_date: datetime = None, end_date: datetime = None):
+        """Условия выборки архива за период: (архивные строки, помесячные итоги)
+        
+        Месяцы, целиком входящие в период, считаются по monthly_summaries,
+        а неполные месяцы на границах — по строкам archive.transactions.
+        """
+        first_full = None
+        if start_date:
+            first_full = month_start(start_date)
+            if first_full != start_date:
+                first_full = next_month(start_date)
+        last_full = month_start(end_date) if end_date else None
+        
+        # Период внутри одного месяца — итоги не подходят, только строки
+        if first_full and last_full and first_full >= last_full:
+            return 'date >= ? AND date <= ?', [start_date, end_date], '0', []
+        
+        archive_parts, archive_params = [], []
+        if start_date:
+            archive_parts.append('(date >= ? AND date < ?)')
+            archive_params += [start_date, first_full]
+        if end_date:
+            archive_parts.append('(date >= ? AND date <= ?)')
+            archive_params += [last_full, end_date]
+        
+        summary_parts, summary_params = [], []
+        if first_full:
+            summary_parts.append('month >= ?')
+            summary_params.append(first_full.strftime('%Y-%m'))
+        if last_full:
+            summary_parts.append('month < ?')
+            summary_params.append(last_full.strftime('%Y-%m'))
+        
+        return (
+            ' OR '.join(archive_parts) or '0', archive_params,
+            ' AND '.join(summary_parts) or '1', summary_params
+        )
+    
+    def get_categories(self, user_id: int = None, type_: str = None) -> List[Category]:
+        """Получить категории"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = row_factory(Category)
             
-            # Общая статистика
-            query = '''
-                SELECT 
-                    SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as total_expenses,
-                    SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as total_income,
-                    COUNT(*) as transaction_count
-                FROM transactions 
-                WHERE user_id = ?
+            query = f'''
+                SELECT {columns(Category)} FROM categories 
+                WHERE (user_id IS NULL OR user_id = ?)
             '''
             params = [user_id]
             
-            if start_date:
-                query += ' AND date >= ?'
-                params.append(start_date)
-            
-            if end_date:
-                query += ' AND date <= ?'
-                params.append(end_date)
+            if type_:
+                query += ' AND type = ?'
+                params.append(type_)
             
+            query += ' ORDER BY type, name'
             cursor.execute(query, params)
-            stats = dict(cursor.fetchone() or {})
+            return cursor.fetchall()
+    
+    def search_transactions(self, user_id: int, text: str, limit: int = 10,
+                            start_date: datetime = None, end_date: datetime = None,
+                            category_id: int = None,
+                            after: Tuple[float, int] = None) -> List[Transaction]:
+        """Полнотекстовый поиск по описаниям транзакций пользователя (включая архив).
+        
+        Результаты упорядочены по релевантности (bm25, меньше — лучше), затем по id.
+        Для следующей страницы передайте after=(score, id) последней записи.
+        category_id отбирает записи всех категорий с тем же именем и типом.
+        """
+        match = build_match_query(text, user_id)
+        if match is None:
+            return []
+        
+        # Keyset-пагинация по (score, id): без OFFSET и повторного пропуска строк
+        keyset, keyset_params = '', []
+        if after:
+            keyset = ' AND (score > ? OR (score = ? AND id > ?))'
+            keyset_params = [after[0], after[0], after[1]]
+        
+        conditions, filter_params = '', []
+        if start_date:
+            conditions += ' AND t.date >= ?'
+            filter_params.append(start_date)
+        if end_date:
+            conditions += ' AND t.date <= ?'
+            filter_params.append(end_date)
+        if category_id:
+            # Все категории с тем же именем и типом: общая, личная и дубли прежних версий
+            conditions += ''' AND t.category_id IN (
+                SELECT s.id FROM categories c
+                JOIN categories s ON s.name = c.name AND s.type = c.type
+                WHERE c.id = ? AND (s.user_id IS NULL OR s.user_id = ?)
+            )'''
+            filter_params.extend([category_id, user_id])
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory(Transaction)
             
-            # Статистика по категориям (только расходы)
+            # Слова запроса уже содержат пользователя, поэтому без фильтров лучшие
+            # limit строк выбираются внутри FTS5, а с таблицей соединяются только они
+            parts, params = [], []
+            for schema in ('main', 'archive'):
+                if conditions:
+                    ranked = f'''
+                        SELECT f.rowid AS id, bm25(f.transactions_fts) AS score
+                        FROM {schema}.transactions_fts AS f
+                        JOIN {schema}.transactions t ON t.id = f.rowid
+                        WHERE f.transactions_fts MATCH ?{conditions}
+                    '''
+                    params += [match, *filter_params]
+                else:
+                    ranked = f'''
+                        SELECT rowid AS id, bm25(transactions_fts) AS score
+                        FROM {schema}.transactions_fts
+                        WHERE transactions_fts MATCH ?
+                    '''
+                    params.append(match)
+                parts.append(f'''
+                    SELECT {TRANSACTION_SELECT}, r.score
+                    FROM (SELECT * FROM ({ranked}) WHERE 1{keyset} ORDER BY score, id LIMIT ?) r
+                    JOIN {schema}.transactions t ON t.id = r.id
+                    JOIN categories c ON t.category_id = c.id
+                    WHERE t.user_id = ?
+                ''')
+                params += [*keyset_params, limit, user_id]
+            
+            query = f'SELECT * FROM ({" UNION ALL ".join(parts)}) ORDER BY score, id LIMIT ?'
+            params.append(limit)
+            
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
+    # Повторяющиеся операции
+    @writes()
+    def add_recurring(self, user_id: int, category_id: int, amount: float, description: str,
+                      type_: str, interval: str, start_date: datetime = None,
+                      ledger_id: int = None) -> int:
+        """Добавить правило повторяющейся операции (первая запись — в start_date)"""
+        if start_date is None:
+            start_date = datetime.now()
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute('''
-                SELECT c.name, c.emoji, SUM(t.amount) as total
-                FROM transactions t
-                JOIN categories c ON t.category_id = c.id
-                WHERE t.user_id = ? AND t.type = 'expense'
-                GROUP BY c.id
-                ORDER BY total DESC
+                INSERT INTO recurring_transactions
+                    (user_id, category_id, amount, description, type, interval, start_date, next_due, ledger_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, category_id, amount, description, type_, interval, start_date, start_date,
+                  ledger_id))
+            
+            return cursor.lastrowid
+    
+    def get_recurring(self, user_id: int) -> List[RecurringRule]:
+        """Активные правила пользователя"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory(RecurringRule)
+            cursor.execute(f'''
+                SELECT r.id, r.user_id, r.category_id, r.amount, r.description, r.type,
+                       r.interval, r.start_date, r.occurrences, r.next_due, r.active,
+                       r.ledger_id, c.name, c.emoji
+                FROM recurring_transactions r
+                JOIN categories c ON r.category_id = c.id
+                WHERE r.user_id = ? AND r.active = 1
+                ORDER BY r.next_due
             ''', (user_id,))
+            return cursor.fetchall()
+    
+    @writes()
+    def deactivate_recurring(self, rule_id: int, user_id: int) -> bool:
+        """Отключить правило пользователя (созданные записи остаются)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE recurring_transactions SET active = 0 WHERE id = ? AND user_id = ?',
+                (rule_id, user_id)
+            )
+            return cursor.rowcount > 0
+    
+    @writes(batch=False)
+    def materialize_recurring(self, now: datetime = None, limit: int = RECURRING_BATCH) -> Tuple[int, int]:
+        """Создать записи по всем наступившим повторениям всех пользователей
+        
+        Один проход: выборка правил по индексу idx_recurring_due, один executemany
+        для транзакций и один для новых next_due — в одной транзакции (BEGIN IMMEDIATE),
+        поэтому повторный запуск или запуск после простоя не создает дублей, а все
+        пропущенные повторения добавляются с их собственными датами.
+        
+        Создает около limit записей (правило обрабатывается целиком, поэтому
+        последнее может немного превысить limit); возвращает (правил, создано
+        записей). Запись остальных на это время ждет, поэтому limit небольшой,
+        а отставание разбирается повторными вызовами до (0, 0) — см. jobs.recurring_job.
+        """
+        if now is None:
+            now = datetime.now()
+        
+        with self.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, user_id, category_id, amount, description, type,
+                       interval, start_date, occurrences, ledger_id
+                FROM recurring_transactions
+                WHERE active = 1 AND next_due <= ?
+                ORDER BY next_due
+                LIMIT ?
+            ''', (now, limit))
             
-            categories = [dict(row) for row in cursor.fetchall()]
-            stats['categories'] = categories
+            transactions = []
+            schedule = []
+            for (rule_id, user_id, category_id, amount, description, type_,
+                 interval, start_date, n, ledger_id) in cursor.fetchall():
+                date = recurring_occurrence(start_date, interval, n)
+                while date <= now:
+                    transactions.append((user_id, category_id, amount, description, type_, date, ledger_id))
+                    n += 1
+                    date = recurring_occurrence(start_date, interval, n)
+                schedule.append((n, date, rule_id))
+                if len(transactions) >= limit:
+                    break
             
-            return stats
+            # Вставка в порядке индекса (user_id, date) меньше перемещается по B-дереву
+            transactions.sort(key=lambda row: (row[0], row[5]))
+            cursor.executemany('''
+                INSERT INTO transactions (user_id, category_id, amount, description, type, date, ledger_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', transactions)
+            cursor.executemany(
+                'UPDATE recurring_transactions SET occurrences = ?, next_due = ? WHERE id = ?',
+                schedule
+            )
+        
+        if schedule:
+            logger.info(f"🔁 Повторяющиеся операции: {len(schedule)} правил, {len(transactions)} записей")
+        return len(schedule), len(transactions)
     
-    def get_categories(self, user_id: int = None, type_: str = None) -> List[dict]:
-        """Получить категории"""
+    # Общие учеты
+    @writes()
+    def create_ledger(self, owner_id: int, name: str) -> Ledger:
+        """Создать общий учет; владелец сразу становится участником"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO ledgers (name, owner_id, invite_code) VALUES (?, ?, ?)',
+                (name, owner_id, secrets.token_hex(4))
+            )
+            ledger_id = cursor.lastrowid
+            cursor.execute(
+                'INSERT INTO ledger_members (ledger_id, user_id) VALUES (?, ?)',
+                (ledger_id, owner_id)
+            )
             
-            query = '''
-                SELECT * FROM categories 
-                WHERE user_id IS NULL OR user_id = ?
-            '''
-            params = []
+            cursor.row_factory = row_factory(Ledger)
+            cursor.execute(f'SELECT {columns(Ledger)} FROM ledgers WHERE id = ?', (ledger_id,))
+            return cursor.fetchone()
+    
+    @writes()
+    def join_ledger(self, user_id: int, invite_code: str) -> Optional[Ledger]:
+        """Вступить в учет по коду приглашения; None, если код неверный"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory(Ledger)
+            cursor.execute(
+                f'SELECT {columns(Ledger)} FROM ledgers WHERE invite_code = ?',
+                (invite_code.strip().lower(),)
+            )
+            ledger = cursor.fetchone()
+            
+            if ledger:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO ledger_members (ledger_id, user_id) VALUES (?, ?)',
+                    (ledger.id, user_id)
+                )
+            return ledger
+    
+    @writes()
+    def leave_ledger(self, user_id: int, ledger_id: int) -> bool:
+        """Выйти из учета (записи участника в учете остаются)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'DELETE FROM ledger_members WHERE ledger_id = ? AND user_id = ?',
+                (ledger_id, user_id)
+            )
+            left = cursor.rowcount > 0
+            cursor.execute(
+                'UPDATE users SET active_ledger_id = NULL WHERE id = ? AND active_ledger_id = ?',
+                (user_id, ledger_id)
+            )
+            return left
+    
+    @writes()
+    def set_active_ledger(self, user_id: int, ledger_id: int = None) -> bool:
+        """Выбрать учет для новых записей (None — личный); только для участника"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE users SET active_ledger_id = ?
+                WHERE id = ? AND (? IS NULL OR EXISTS (
+                    SELECT 1 FROM ledger_members WHERE ledger_id = ? AND user_id = users.id
+                ))
+            ''', (ledger_id, user_id, ledger_id, ledger_id))
+            return cursor.rowcount > 0
+    
+    def get_user_ledgers(self, user_id: int) -> List[Ledger]:
+        """Учеты, в которых состоит пользователь"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory(Ledger)
+            cursor.execute(f'''
+                SELECT {columns(Ledger, 'l.')}
+                FROM ledger_members m
+                JOIN ledgers l ON l.id = m.ledger_id
+                WHERE m.user_id = ?
+                ORDER BY l.name
+            ''', (user_id,))
+            return cursor.fetchall()
+    
+    def get_ledger_members(self, ledger_id: int) -> List[User]:
+        """Участники учета"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory(User)
+            cursor.execute(f'''
+                SELECT {columns(User, 'u.')}
+                FROM ledger_members m
+                JOIN users u ON u.id = m.user_id
+                WHERE m.ledger_id = ?
+                ORDER BY m.joined_at
+            ''', (ledger_id,))
+            return cursor.fetchall()
+    
+    # Архивация и обслуживание
+    @writes(batch=False)
+    def archive_transactions(self, before: datetime, after_id: int = 0,
+                             limit: int = ARCHIVE_BATCH) -> Tuple[int, int]:
+        """Перенести в архив очередной пакет транзакций старше начала месяца `before`
+        
+        Пакет — до limit строк с id больше after_id (по порядку id, поэтому
+        таблица просматривается один раз за все пакеты). Два шага, каждый —
+        короткая транзакция в одном файле: в WAL SQLite не гарантирует
+        атомарный COMMIT сразу в основную базу и архив.
+        1. Строки копируются в archive.transactions (повторная копия игнорируется).
+        2. Суммы скопированных строк добавляются в monthly_summaries
+           (и ledger_monthly_summaries для общих учетов), строки удаляются
+           из основной базы.
+        Сбой между шагами не теряет данных: следующий запуск завершит перенос.
+        Возвращает (перенесено строк, id последней строки пакета); перенос
+        продолжается вызовами с after_id до 0 строк — см. jobs.maintenance_job.
+        """
+        cutoff = month_start(before)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT MAX(id) FROM (
+                    SELECT id FROM main.transactions
+                    WHERE id > ? AND date < ?
+                    ORDER BY id LIMIT ?
+                )
+            ''', (after_id, cutoff, limit))
+            last_id = cursor.fetchone()[0]
+            if last_id is None:
+                return 0, after_id
             
-            if user_id is not None:
-                params.append(user_id)
+            batch = 'id > ? AND id <= ? AND date < ?'
+            params = (after_id, last_id, cutoff)
+            # Перебор только строк пакета по rowid, проверка копии — поиском по id в архиве
+            archived = f'''{batch} AND EXISTS (
+                SELECT 1 FROM archive.transactions a WHERE a.id = main.transactions.id
+            )'''
             
-            if type_:
-                query += ' AND type = ?'
-                params.append(type_)
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO archive.transactions ({TRANSACTION_COLUMNS})
+                SELECT {TRANSACTION_COLUMNS} FROM main.transactions WHERE {batch}
+            ''', params)
+            conn.commit()
             
-            query += ' ORDER BY type, name'
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
\ No newline at end of file
+            cursor.execute(f'''
+                INSERT INTO monthly_summaries (user_id, month, category_id, type, total, count)
+                SELECT user_id, substr(date, 1, 7), category_id, type, SUM(amount), COUNT(*)
+                FROM main.transactions WHERE {archived}
+                GROUP BY user_id, substr(date, 1, 7), category_id, type
+                ON CONFLICT (user_id, month, category_id, type) DO UPDATE SET
+                    total = total + excluded.total,
+                    count = count + excluded.count
+            ''', params)
+            cursor.execute(f'''
+                INSERT INTO ledger_monthly_summaries (ledger_id, month, category_id, type, total, count)
+                SELECT ledger_id, substr(date, 1, 7), category_id, type, SUM(amount), COUNT(*)
+                FROM main.transactions WHERE {archived} AND ledger_id IS NOT NULL
+                GROUP BY ledger_id, substr(date, 1, 7), category_id, type
+                ON CONFLICT (ledger_id, month, category_id, type) DO UPDATE SET
+                    total = total + excluded.total,
+                    count = count + excluded.count
+            ''', params)
+            cursor.execute(f'DELETE FROM main.transactions WHERE {archived}', params)
+            moved = cursor.rowcount
+        
+        if moved:
+            logger.info(f"📦 В архив перенесено {moved} транзакций (до {cutoff:%Y-%m-%d})")
+        return moved, last_id
+    
+    @writes(batch=False)
+    def maintain(self, vacuum: bool = True):
+        """Обслуживание: оптимизация FTS, ANALYZE и (опционально) VACUUM
+        
+        VACUUM — только основной базы и только при доле свободных страниц
+        от VACUUM_FREE_RATIO (например, после первой архивации). Архив лишь
+        пополняется, свободных страниц в нем почти не бывает.
+        """
+        with self.get_connection() as conn:
+            for schema in ('main', 'archive'):
+                conn.execute(f"INSERT INTO {schema}.transactions_fts (transactions_fts) VALUES ('optimize')")
+            conn.commit()
+            
+            conn.execute('ANALYZE main')
+            conn.execute('ANALYZE archive')
+            conn.commit()
+            
+            if vacuum:
+                free = conn.execute('PRAGMA main.freelist_count').fetchone()[0]
+                pages = conn.execute('PRAGMA main.page_count').fetchone()[0]
+                if pages and free / pages >= VACUUM_FREE_RATIO:
+                    conn.execute('VACUUM main')
+                    logger.info(f"🧹 VACUUM: освобождено {free} из {pages} страниц")
+        
+        logger.info("🧹 Обслуживание базы данных завершено")
+
+
+_db: Optional[Database] = None
+
+
+def get_db() -> Database:
+    """Общий экземпляр базы данных (создается при первом обращении, не при импорте)
+    
+    В процессе-воркере (задан DB_WRITER_ADDRESS) записи уходят процессу записи.
+    """
+    global _db
+    if _db is None:
+        writer = None
+        address = os.getenv('DB_WRITER_ADDRESS')
+        if address:
+            from src.writer import WriterClient
+            writer = WriterClient(address, bytes.fromhex(os.environ['DB_WRITER_AUTHKEY']))
+        _db = Database(os.getenv('DB_NAME', 'finance.db'), writer=writer)
+    return _db
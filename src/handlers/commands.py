@@ -1,35 +1,41 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from telegram import Update
+from telegram.helpers import escape_markdown
 from telegram.ext import ContextTypes
-from src.database import Database
+from src.database import get_db
 from src.keyboards import get_main_keyboard, get_statistics_period_keyboard, get_settings_keyboard
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start"""
     user = update.effective_user
     
     # Регистрируем/получаем пользователя
-    user_data = db.get_or_create_user(
+    user_data = await asyncio.to_thread(
+        get_db().get_or_create_user,
         telegram_id=user.id,
         username=user.username,
         first_name=user.first_name
     )
     
     # Сохраняем ID пользователя в контексте
-    context.user_data['user_id'] = user_data['id']
+    context.user_data['user_id'] = user_data.id
+    context.user_data['ledger_id'] = user_data.active_ledger_id
     
     welcome_text = (
-        f"👋 Привет, {user.first_name}!\n\n"
+        f"👋 Привет, {escape_markdown(user.first_name)}!\n\n"
         f"💰 *Финансовый помощник* готов к работе!\n\n"
         f"*Доступные команды:*\n"
         f"• /start - Главное меню\n"
         f"• /add - Добавить операцию\n"
         f"• /stats - Статистика\n"
         f"• /history - История операций\n"
+        f"• /search - Поиск по описаниям\n"
+        f"• /repeat - Повторяющиеся операции\n"
+        f"• /ledger - Общий учет (семья, друзья)\n"
         f"• /export - Экспорт данных\n"
         f"• /help - Помощь\n\n"
         f"*Или используйте кнопки ниже:*"
@@ -58,6 +64,14 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "2. Выберите категорию\n"
         "3. Введите сумму\n"
         "4. Добавьте описание (необязательно)\n\n"
+        "*Быстрый ввод одним сообщением:*\n"
+        "• `500 еда обед` - расход\n"
+        "• `+30000 зарплата` - доход\n"
+        "Категорию можно указать началом названия или эмодзи.\n\n"
+        "*Общий учет:*\n"
+        "• `/ledger new Семья` - создать и получить код приглашения\n"
+        "• `/ledger join код` - присоединиться\n"
+        "Пока учет выбран в /ledger, новые записи, история и статистика общие.\n\n"
         "*Для связи с разработчиком:*\n"
         "Если нашли ошибку или есть предложения,\n"
         "пишите: @ваш_username"
@@ -92,8 +106,16 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Пожалуйста, сначала отправьте /start")
         return
     
-    # Получаем последние 10 транзакций
-    transactions = db.get_user_transactions(user_id, limit=10)
+    ledger_id = context.user_data.get('ledger_id')
+    
+    # Получаем последние 10 транзакций (всех участников, если выбран общий учет)
+    transactions = await asyncio.to_thread(
+        get_db().get_user_transactions, user_id, limit=10, ledger_id=ledger_id
+    )
+    authors = {}
+    if ledger_id:
+        members = await asyncio.to_thread(get_db().get_ledger_members, ledger_id)
+        authors = {member.id: escape_markdown(member.first_name or '') for member in members}
     
     if not transactions:
         await update.message.reply_text(
@@ -107,17 +129,18 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     total_income = 0
     
     for t in transactions:
-        date = datetime.strptime(t['date'], '%Y-%m-%d %H:%M:%S').strftime('%d.%m %H:%M')
-        amount = t['amount']
-        type_icon = "➖" if t['type'] == 'expense' else "➕"
+        date = t.date.strftime('%d.%m %H:%M')
+        amount = t.amount
+        type_icon = "➖" if t.type == 'expense' else "➕"
         
-        if t['type'] == 'expense':
+        if t.type == 'expense':
             total_expenses += amount
         else:
             total_income += amount
         
-        desc = f"\n   📝 {t['description']}" if t['description'] else ""
-        message += f"{type_icon} *{t['category_name']}*: {amount:.2f} руб.\n   📅 {date}{desc}\n\n"
+        desc = f"\n   📝 {escape_markdown(t.description)}" if t.description else ""
+        author = f"\n   👤 {authors.get(t.user_id, 'бывший участник')}" if ledger_id else ""
+        message += f"{type_icon} *{t.category_name}*: {amount:.2f} руб.\n   📅 {date}{desc}{author}\n\n"
     
     message += f"*Итого:*\n"
     message += f"➖ Расходы: {total_expenses:.2f} руб.\n"
@@ -1,12 +1,13 @@
+import asyncio
 import logging
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
-from src.database import Database
-from src.keyboards import get_categories_keyboard, get_main_keyboard
+from src.database import get_db
+from src.keyboards import get_categories_keyboard, get_main_keyboard, get_undo_keyboard
+from src.quick_add import parse_quick_entry, get_category_index
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 # Состояния ConversationHandler
 SELECTING_CATEGORY, ENTERING_AMOUNT, ENTERING_DESCRIPTION = range(3)
@@ -21,7 +22,7 @@ async def start_add_transaction(update: Update, context: ContextTypes.DEFAULT_TY
     context.user_data['transaction_type'] = type_
     
     # Получаем категории
-    categories = db.get_categories(user_id=user_id, type_=type_)
+    categories = get_db().get_categories(user_id=user_id, type_=type_)
     
     type_text = "расход" if type_ == 'expense' else "доход"
     await update.message.reply_text(
@@ -100,24 +101,25 @@ async def description_received(update: Update, context: ContextTypes.DEFAULT_TYP
     
     try:
         # Сохраняем транзакцию
-        transaction_id = db.add_transaction(
+        transaction_id = await asyncio.to_thread(
+            get_db().add_transaction,
             user_id=user_id,
             category_id=category_id,
             amount=amount,
             description=description,
-            type_=type_
+            type_=type_,
+            ledger_id=context.user_data.get('ledger_id')
         )
         
         # Получаем информацию о категории
-        categories = db.get_categories(user_id=user_id)
-        category = next((c for c in categories if c['id'] == category_id), None)
+        category = get_category_index(get_db(), user_id).by_id[category_id]
         
         type_text = "расход" if type_ == 'expense' else "доход"
         type_icon = "➖" if type_ == 'expense' else "➕"
         
         message = (
             f"✅ {type_icon} *{type_text.capitalize()} сохранен!*\n\n"
-            f"*Категория:* {category['emoji']} {category['name']}\n"
+            f"*Категория:* {category.emoji} {category.name}\n"
             f"*Сумма:* {amount:.2f} руб.\n"
         )
         
@@ -161,4 +163,62 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.pop('category_id', None)
     context.user_data.pop('amount', None)
     
-    return ConversationHandler.END
\ No newline at end of file
+    return ConversationHandler.END
+
+async def quick_add_received(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Быстрый ввод одним сообщением: «500 еда обед» или «+30000 зарплата»"""
+    user_id = context.user_data.get('user_id')
+    if not user_id:
+        await update.message.reply_text("Пожалуйста, сначала отправьте /start")
+        return
+    
+    entry = parse_quick_entry(update.message.text)
+    if entry is None:
+        return
+    
+    type_, amount, rest = entry
+    category, description = get_category_index(get_db(), user_id).resolve(rest, type_)
+    if category is None:
+        await update.message.reply_text("❌ Не удалось определить категорию.")
+        return
+    
+    try:
+        transaction_id = await asyncio.to_thread(
+            get_db().add_transaction,
+            user_id=user_id,
+            category_id=category.id,
+            amount=amount,
+            description=description,
+            type_=type_,
+            ledger_id=context.user_data.get('ledger_id')
+        )
+    except Exception as e:
+        logger.error(f"Ошибка сохранения транзакции: {e}")
+        await update.message.reply_text(
+            "❌ Произошла ошибка при сохранении. Попробуйте еще раз.",
+            reply_markup=get_main_keyboard()
+        )
+        return
+    
+    type_icon = "➖" if type_ == 'expense' else "➕"
+    message = f"✅ {type_icon} {category.emoji} {category.name}: {amount:.2f} руб."
+    if description:
+        message += f"\n📝 {description}"
+    
+    await update.message.reply_text(message, reply_markup=get_undo_keyboard(transaction_id))
+    
+    logger.info(f"⚡ Быстрый ввод: {amount} руб. (user: {user_id})")
+
+async def undo_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отмена только что добавленной записи"""
+    query = update.callback_query
+    await query.answer()
+    
+    user_id = context.user_data.get('user_id')
+    transaction_id = int(query.data.replace('undo_', ''))
+    
+    if user_id and await asyncio.to_thread(get_db().delete_transaction, transaction_id, user_id):
+        await query.edit_message_text(f"↩️ Запись #{transaction_id} отменена.")
+        logger.info(f"↩️ Отменена запись #{transaction_id} (user: {user_id})")
+    else:
+        await query.edit_message_text("❌ Запись не найдена.")
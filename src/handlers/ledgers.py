@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.helpers import escape_markdown
+from telegram.ext import ContextTypes
+from src.database import get_db
+from src.keyboards import get_ledgers_keyboard
+
+logger = logging.getLogger(__name__)
+
+LEDGER_HELP = (
+    "👥 *Общий учет*\n\n"
+    "Несколько человек записывают операции в один учет и видят общую\n"
+    "историю и статистику.\n\n"
+    "• /ledger new <название> - создать учет\n"
+    "• /ledger join <код> - присоединиться по коду приглашения\n"
+    "• /ledger leave - выйти из выбранного учета\n"
+    "• /ledger - выбрать, куда записывать операции"
+)
+
+
+async def ledger_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /ledger"""
+    user_id = context.user_data.get('user_id')
+    if not user_id:
+        await update.message.reply_text("Пожалуйста, сначала отправьте /start")
+        return
+
+    args = context.args or []
+    action = args[0].lower() if args else ''
+    db = get_db()
+
+    if action == 'new' and len(args) > 1:
+        ledger = await asyncio.to_thread(db.create_ledger, user_id, ' '.join(args[1:])[:64])
+        await asyncio.to_thread(db.set_active_ledger, user_id, ledger.id)
+        context.user_data['ledger_id'] = ledger.id
+        await update.message.reply_text(
+            f"✅ Учет «{escape_markdown(ledger.name)}» создан и выбран для новых записей.\n\n"
+            f"Код приглашения: `{ledger.invite_code}`\n"
+            f"Участники присоединяются командой /ledger join {ledger.invite_code}",
+            parse_mode='Markdown'
+        )
+        logger.info(f"👥 Создан учет #{ledger.id} (user: {user_id})")
+
+    elif action == 'join' and len(args) == 2:
+        ledger = await asyncio.to_thread(db.join_ledger, user_id, args[1])
+        if ledger is None:
+            await update.message.reply_text("❌ Учет с таким кодом не найден.")
+            return
+        await asyncio.to_thread(db.set_active_ledger, user_id, ledger.id)
+        context.user_data['ledger_id'] = ledger.id
+        await update.message.reply_text(
+            f"✅ Вы присоединились к учету «{ledger.name}». Новые записи будут общими."
+        )
+        logger.info(f"👥 Пользователь {user_id} вступил в учет #{ledger.id}")
+
+    elif action == 'leave':
+        ledger_id = context.user_data.get('ledger_id')
+        if not ledger_id or not await asyncio.to_thread(db.leave_ledger, user_id, ledger_id):
+            await update.message.reply_text("Сначала выберите общий учет в /ledger")
+            return
+        context.user_data['ledger_id'] = None
+        await update.message.reply_text("👋 Вы вышли из учета. Новые записи снова личные.")
+        logger.info(f"👋 Пользователь {user_id} вышел из учета #{ledger_id}")
+
+    elif action:
+        await update.message.reply_text(LEDGER_HELP, parse_mode='Markdown')
+
+    else:
+        await _send_ledgers(update, context, user_id)
+
+
+async def _send_ledgers(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+    """Список учетов пользователя с выбором активного"""
+    ledgers = await asyncio.to_thread(get_db().get_user_ledgers, user_id)
+    if not ledgers:
+        await update.message.reply_text(LEDGER_HELP, parse_mode='Markdown')
+        return
+
+    message = "👥 *Ваши учеты:*\n\n"
+    for ledger in ledgers:
+        message += f"• {escape_markdown(ledger.name)} — код `{ledger.invite_code}`\n"
+    message += "\nВыберите, куда записывать новые операции:"
+
+    await update.message.reply_text(
+        message,
+        parse_mode='Markdown',
+        reply_markup=get_ledgers_keyboard(ledgers, context.user_data.get('ledger_id'))
+    )
+
+
+async def ledger_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Выбор активного учета по кнопке (0 — личный)"""
+    query = update.callback_query
+    await query.answer()
+
+    user_id = context.user_data.get('user_id')
+    ledger_id = int(query.data.replace('ledger_use_', '')) or None
+
+    if not user_id or not await asyncio.to_thread(get_db().set_active_ledger, user_id, ledger_id):
+        await query.edit_message_text("❌ Учет не найден.")
+        return
+
+    context.user_data['ledger_id'] = ledger_id
+    if ledger_id:
+        await query.edit_message_text("👥 Новые записи, история и статистика — общие.")
+    else:
+        await query.edit_message_text("👤 Новые записи, история и статистика — личные.")
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from datetime import datetime
+from telegram import Update
+from telegram.helpers import escape_markdown
+from telegram.ext import ContextTypes
+from src.database import get_db
+from src.keyboards import get_recurring_keyboard
+from src.quick_add import parse_quick_entry, get_category_index
+from src.utils import parse_date
+
+logger = logging.getLogger(__name__)
+
+# Слово периода -> interval в базе
+INTERVALS = {
+    'день': 'daily', 'ежедневно': 'daily',
+    'неделя': 'weekly', 'еженедельно': 'weekly',
+    'месяц': 'monthly', 'ежемесячно': 'monthly',
+}
+
+INTERVAL_TEXT = {'daily': 'каждый день', 'weekly': 'каждую неделю', 'monthly': 'каждый месяц'}
+
+RECURRING_HELP = (
+    "🔁 *Повторяющиеся операции*\n\n"
+    "*Добавить:* /repeat <период> <сумма> <категория> [описание] [с:дд.мм.гггг]\n"
+    "• /repeat месяц 25000 квартира аренда с:05.11.2024\n"
+    "• /repeat месяц +30000 зарплата\n"
+    "• /repeat неделя 500 транспорт проездной\n\n"
+    "Период: день, неделя или месяц. Записи добавляются автоматически,\n"
+    "в том числе пропущенные, если бот был недоступен."
+)
+
+
+async def recurring_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /repeat: список правил или добавление нового"""
+    user_id = context.user_data.get('user_id')
+    if not user_id:
+        await update.message.reply_text("Пожалуйста, сначала отправьте /start")
+        return
+
+    args = context.args or []
+    if not args:
+        await _send_rules(update, user_id)
+        return
+
+    interval = INTERVALS.get(args[0].lower())
+    start_date = None
+    words = []
+    for arg in args[1:]:
+        if arg.lower().startswith('с:') and parse_date(arg[2:]):
+            start_date = parse_date(arg[2:]).replace(hour=9)
+        else:
+            words.append(arg)
+    entry = parse_quick_entry(' '.join(words))
+
+    if interval is None or entry is None:
+        await update.message.reply_text(RECURRING_HELP, parse_mode='Markdown')
+        return
+
+    type_, amount, rest = entry
+    category, description = get_category_index(get_db(), user_id).resolve(rest, type_)
+    if category is None:
+        await update.message.reply_text("❌ Не удалось определить категорию.")
+        return
+
+    if start_date is None:
+        start_date = datetime.now()
+
+    rule_id = await asyncio.to_thread(
+        get_db().add_recurring,
+        user_id=user_id,
+        category_id=category.id,
+        amount=amount,
+        description=description,
+        type_=type_,
+        interval=interval,
+        start_date=start_date,
+        ledger_id=context.user_data.get('ledger_id')
+    )
+
+    type_icon = "➖" if type_ == 'expense' else "➕"
+    await update.message.reply_text(
+        f"🔁 {type_icon} {category.emoji} {category.name}: {amount:.2f} руб. "
+        f"{INTERVAL_TEXT[interval]}\n"
+        f"Первая запись: {start_date:%d.%m.%Y}\n\nID правила: #{rule_id}"
+    )
+    logger.info(f"🔁 Добавлено правило #{rule_id} (user: {user_id})")
+
+
+async def _send_rules(update: Update, user_id: int):
+    """Список активных правил пользователя"""
+    rules = await asyncio.to_thread(get_db().get_recurring, user_id)
+
+    if not rules:
+        await update.effective_message.reply_text(RECURRING_HELP, parse_mode='Markdown')
+        return
+
+    message = "🔁 *Повторяющиеся операции:*\n\n"
+    for rule in rules:
+        type_icon = "➖" if rule.type == 'expense' else "➕"
+        desc = f" — {escape_markdown(rule.description)}" if rule.description else ""
+        shared = "👥 " if rule.ledger_id else ""
+        message += (
+            f"#{rule.id} {shared}{type_icon} {rule.category_emoji} *{rule.category_name}*: "
+            f"{rule.amount:.2f} руб. {INTERVAL_TEXT[rule.interval]}{desc}\n"
+            f"   ⏭ {rule.next_due:%d.%m.%Y}\n\n"
+        )
+
+    await update.effective_message.reply_text(
+        message,
+        parse_mode='Markdown',
+        reply_markup=get_recurring_keyboard(rules)
+    )
+
+
+async def recurring_delete(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отключение правила по кнопке"""
+    query = update.callback_query
+    await query.answer()
+
+    user_id = context.user_data.get('user_id')
+    rule_id = int(query.data.replace('repeat_del_', ''))
+
+    if user_id and await asyncio.to_thread(get_db().deactivate_recurring, rule_id, user_id):
+        await query.edit_message_text(
+            f"🗑 Правило #{rule_id} отключено. Уже созданные записи сохранены."
+        )
+        logger.info(f"🗑 Отключено правило #{rule_id} (user: {user_id})")
+    else:
+        await query.edit_message_text("❌ Правило не найдено.")
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.helpers import escape_markdown
+from telegram.ext import ContextTypes
+from src.database import get_db
+from src.keyboards import get_main_keyboard, get_search_more_keyboard
+from src.utils import parse_search_args
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 10
+
+SEARCH_HELP = (
+    "🔎 *Поиск по описаниям*\n\n"
+    "*Пример:* /search обед\n\n"
+    "*Фильтры:*\n"
+    "• #еда - только категория\n"
+    "• с:01.10.2024 - начиная с даты\n"
+    "• по:31.10.2024 - по дату включительно"
+)
+
+
+def format_search_results(transactions: list, page: int) -> str:
+    """Форматирование страницы результатов поиска"""
+    message = f"🔎 *Результаты поиска* (стр. {page}):\n\n"
+
+    for t in transactions:
+        date = t.date.strftime('%d.%m.%Y')
+        type_icon = "➖" if t.type == 'expense' else "➕"
+        message += (
+            f"{type_icon} *{t.category_name}*: {t.amount:.2f} руб.\n"
+            f"   📅 {date}\n   📝 {escape_markdown(t.description)}\n\n"
+        )
+
+    return message
+
+
+async def _send_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Выполнить поиск по сохраненному состоянию и отправить страницу"""
+    state = context.user_data['search']
+
+    # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+    transactions = await asyncio.to_thread(
+        get_db().search_transactions,
+        state['user_id'],
+        state['text'],
+        limit=PAGE_SIZE + 1,
+        start_date=state['start_date'],
+        end_date=state['end_date'],
+        category_id=state['category_id'],
+        after=state['after']
+    )
+    has_more = len(transactions) > PAGE_SIZE
+    transactions = transactions[:PAGE_SIZE]
+
+    if not transactions:
+        context.user_data.pop('search', None)
+        await update.effective_message.reply_text(
+            "📭 Ничего не найдено.",
+            reply_markup=get_main_keyboard()
+        )
+        return
+
+    state['page'] += 1
+    last = transactions[-1]
+    state['after'] = (last.score, last.id)
+
+    await update.effective_message.reply_text(
+        format_search_results(transactions, state['page']),
+        parse_mode='Markdown',
+        reply_markup=get_search_more_keyboard() if has_more else get_main_keyboard()
+    )
+
+    if not has_more:
+        context.user_data.pop('search', None)
+
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /search"""
+    user_id = context.user_data.get('user_id')
+    if not user_id:
+        await update.message.reply_text("Пожалуйста, сначала отправьте /start")
+        return
+
+    args = parse_search_args(context.args or [])
+    if not args['text'].strip():
+        await update.message.reply_text(SEARCH_HELP, parse_mode='Markdown')
+        return
+
+    category_id = None
+    if args['category']:
+        categories = get_db().get_categories(user_id=user_id)
+        # Точное имя важнее префикса: "#кафе" не должен попасть в «Кафетерий»
+        category = next(
+            (c for c in categories if c.name.lower() == args['category']),
+            next((c for c in categories if c.name.lower().startswith(args['category'])), None)
+        )
+        if category is None:
+            await update.message.reply_text(f"❌ Категория «{args['category']}» не найдена.")
+            return
+        category_id = category.id
+
+    context.user_data['search'] = {
+        'user_id': user_id,
+        'text': args['text'],
+        'start_date': args['start_date'],
+        'end_date': args['end_date'],
+        'category_id': category_id,
+        'after': None,
+        'page': 0
+    }
+
+    await _send_search_page(update, context)
+    logger.info(f"🔎 Поиск «{args['text']}» (user: {user_id})")
+
+
+async def search_more(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Следующая страница результатов поиска"""
+    query = update.callback_query
+    await query.answer()
+
+    await query.edit_message_reply_markup(reply_markup=None)
+
+    if 'search' in context.user_data:
+        await _send_search_page(update, context)
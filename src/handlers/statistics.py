@@ -1,12 +1,12 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.database import Database
-from src.keyboards import get_main_keyboard
+from src.database import get_db
+from src.keyboards import get_main_keyboard, get_statistics_period_keyboard
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 def format_statistics_message(stats: dict, period: str = "все время") -> str:
     """Форматирование сообщения со статистикой"""
@@ -29,13 +29,13 @@ def format_statistics_message(stats: dict, period: str = "все время") ->
         message += f"*Расходы по категориям:*\n"
         
         for i, cat in enumerate(categories[:10], 1):  # Только топ-10
-            percentage = (cat['total'] / total_expenses) * 100
+            percentage = (cat.total / total_expenses) * 100
             bars = "▰" * int(percentage / 5)  # Каждый блок = 5%
             spaces = "▱" * (20 - len(bars))  # Всего 20 символов
             
-            message += f"{i}. {cat['emoji']} {cat['name']}\n"
+            message += f"{i}. {cat.emoji} {cat.name}\n"
             message += f"   {bars}{spaces} {percentage:5.1f}%\n"
-            message += f"   {cat['total']:.2f} руб.\n\n"
+            message += f"   {cat.total:.2f} руб.\n\n"
     
     if len(categories) > 10:
         message += f"... и еще {len(categories) - 10} категорий\n\n"
@@ -56,7 +56,7 @@ def format_statistics_message(stats: dict, period: str = "все время") ->
         # Самая большая категория расходов
         if categories:
             biggest = categories[0]
-            message += f"📌 Самые большие расходы: {biggest['emoji']} {biggest['name']} ({biggest['total']:.2f} руб.)"
+            message += f"📌 Самые большие расходы: {biggest.emoji} {biggest.name} ({biggest.total:.2f} руб.)"
     
     return message
 
@@ -70,37 +70,54 @@ async def handle_statistics_period(update: Update, context: ContextTypes.DEFAULT
         await query.edit_message_text("Пожалуйста, сначала отправьте /start")
         return
     
-    # Определяем период
-    end_date = datetime.now()
+    # Определяем период: до текущего момента, начало — с точностью до минуты,
+    # чтобы повторные запросы попадали в кэш статистики
+    now = datetime.now().replace(second=0, microsecond=0)
     
     if period == 'today':
-        start_date = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_date = now.replace(hour=0, minute=0)
         period_text = "сегодня"
     elif period == 'week':
-        start_date = end_date - timedelta(days=7)
+        start_date = now - timedelta(days=7)
         period_text = "неделю"
     elif period == 'month':
-        start_date = end_date - timedelta(days=30)
+        start_date = now - timedelta(days=30)
         period_text = "месяц"
     elif period == 'year':
-        start_date = end_date - timedelta(days=365)
+        start_date = now - timedelta(days=365)
         period_text = "год"
     else:  # 'all'
         start_date = None
         period_text = "все время"
     
-    # Получаем статистику
-    stats = db.get_statistics(user_id, start_date, end_date)
+    # Получаем статистику (в потоке, чтобы не блокировать обработку других пользователей)
+    stats = await asyncio.to_thread(
+        get_db().get_statistics, user_id, start_date,
+        ledger_id=context.user_data.get('ledger_id')
+    )
     
     if stats['transaction_count'] == 0:
         await query.edit_message_text(
             f"📭 За {period_text} у вас нет записей.\n"
             f"Добавьте первую с помощью кнопки '➕ Добавить расход'",
-            reply_markup=get_main_keyboard()
+            reply_markup=get_statistics_period_keyboard()
         )
         return
     
     # Формируем и отправляем сообщение
     message = format_statistics_message(stats, period_text)
     
-    await query.edit_message_text
\ No newline at end of file
+    await query.edit_message_text(
+        message,
+        parse_mode='Markdown',
+        reply_markup=get_statistics_period_keyboard()
+    )
+
+async def back_to_main(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Возврат в главное меню из inline-клавиатуры"""
+    query = update.callback_query
+    await query.answer()
+    
+    # Reply-клавиатуру нельзя прикрепить к редактируемому сообщению
+    await query.edit_message_text("Возвращаемся в главное меню...")
+    await query.message.reply_text("Главное меню:", reply_markup=get_main_keyboard())
@@ -0,0 +1,62 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from telegram.ext import ContextTypes
+from src.database import get_db, RECURRING_BATCH
+from src.backup import get_store
+
+logger = logging.getLogger(__name__)
+
+# Пауза между пакетами повторяющихся операций, секунд: ожидающий блокировку
+# опрашивает ее с растущими интервалами (до 100 мс) и без паузы не успевает
+# перехватить ее до следующего BEGIN IMMEDIATE
+RECURRING_PAUSE = 0.1
+
+
+async def maintenance_job(context: ContextTypes.DEFAULT_TYPE):
+    """Ежедневное обслуживание: архивация старых транзакций, ANALYZE и VACUUM"""
+    # Транзакции старше стольких дней уходят в архив (0 — не архивировать)
+    archive_after_days = int(os.getenv('ARCHIVE_AFTER_DAYS', '365'))
+    
+    try:
+        if archive_after_days > 0:
+            # Пакетами, как recurring_job: блокировка записи держится доли секунды
+            before = datetime.now() - timedelta(days=archive_after_days)
+            after_id = 0
+            while True:
+                moved, after_id = await asyncio.to_thread(get_db().archive_transactions, before, after_id)
+                if not moved:
+                    break
+                await asyncio.sleep(RECURRING_PAUSE)
+        
+        # Тяжелые операции выполняем вне event loop, чтобы бот продолжал отвечать
+        await asyncio.to_thread(get_db().maintain)
+    except Exception as e:
+        logger.error(f"Ошибка обслуживания базы данных: {e}")
+
+
+async def recurring_job(context: ContextTypes.DEFAULT_TYPE):
+    """Создание записей по наступившим повторяющимся операциям всех пользователей"""
+    try:
+        # Большие отставания (после простоя) обрабатываются несколькими пакетами,
+        # каждый своей короткой транзакцией — записи пользователей идут между ними
+        while True:
+            rules, _ = await asyncio.to_thread(get_db().materialize_recurring, limit=RECURRING_BATCH)
+            if not rules:
+                break
+            await asyncio.sleep(RECURRING_PAUSE)
+    except Exception as e:
+        logger.error(f"Ошибка создания повторяющихся операций: {e}")
+
+
+async def backup_job(context: ContextTypes.DEFAULT_TYPE):
+    """Снимок базы в BACKUP_DIR и удаление старых снимков (бот продолжает работать)"""
+    keep = int(os.getenv('BACKUP_KEEP', '14'))
+    try:
+        store = get_store()
+        db = get_db()
+        await asyncio.to_thread(store.snapshot, db.db_name, db.archive_name)
+        await asyncio.to_thread(store.prune, keep)
+    except Exception as e:
+        logger.error(f"Ошибка резервного копирования: {e}")
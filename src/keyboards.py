@@ -1,5 +1,6 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
 from typing import List, Optional
+from src.models import Category, RecurringRule, Ledger
 
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """Главная клавиатура"""
@@ -10,16 +11,16 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
     ]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
-def get_categories_keyboard(categories: List[dict], type_: str = 'expense') -> InlineKeyboardMarkup:
+def get_categories_keyboard(categories: List[Category], type_: str = 'expense') -> InlineKeyboardMarkup:
     """Клавиатура с категориями"""
     buttons = []
     row = []
     
     for i, category in enumerate(categories):
-        if category['type'] == type_:
+        if category.type == type_:
             button = InlineKeyboardButton(
-                f"{category['emoji']} {category['name']}",
-                callback_data=f"category_{category['id']}"
+                f"{category.emoji} {category.name}",
+                callback_data=f"category_{category.id}"
             )
             row.append(button)
             
@@ -94,4 +95,50 @@ def get_currency_keyboard() -> InlineKeyboardMarkup:
     
     buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data="settings_back")])
     
-    return InlineKeyboardMarkup(buttons)
\ No newline at end of file
+    return InlineKeyboardMarkup(buttons)
+
+def get_undo_keyboard(transaction_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура отмены только что добавленной записи"""
+    buttons = [
+        [InlineKeyboardButton("↩️ Отменить", callback_data=f"undo_{transaction_id}")]
+    ]
+    return InlineKeyboardMarkup(buttons)
+
+def get_recurring_keyboard(rules: List[RecurringRule]) -> InlineKeyboardMarkup:
+    """Клавиатура отключения повторяющихся операций"""
+    buttons = []
+    row = []
+    
+    for rule in rules:
+        row.append(InlineKeyboardButton(f"🗑 #{rule.id}", callback_data=f"repeat_del_{rule.id}"))
+        
+        if len(row) == 3:
+            buttons.append(row)
+            row = []
+    
+    if row:
+        buttons.append(row)
+    
+    return InlineKeyboardMarkup(buttons)
+
+def get_search_more_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура для следующей страницы результатов поиска"""
+    buttons = [
+        [InlineKeyboardButton("➡️ Еще результаты", callback_data="search_more")]
+    ]
+    return InlineKeyboardMarkup(buttons)
+
+def get_ledgers_keyboard(ledgers: List[Ledger], active_id: int = None) -> InlineKeyboardMarkup:
+    """Клавиатура выбора учета для новых записей"""
+    mark = lambda selected: "✅ " if selected else ""
+    buttons = [
+        [InlineKeyboardButton(f"{mark(not active_id)}👤 Личный", callback_data="ledger_use_0")]
+    ]
+    
+    for ledger in ledgers:
+        buttons.append([InlineKeyboardButton(
+            f"{mark(ledger.id == active_id)}👥 {ledger.name}",
+            callback_data=f"ledger_use_{ledger.id}"
+        )])
+    
+    return InlineKeyboardMarkup(buttons)
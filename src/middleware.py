@@ -0,0 +1,159 @@
+import sys
+import time
+import asyncio
+import logging
+from typing import Awaitable, Dict, Hashable, Optional, Set, Tuple
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket по ключу: rate токенов в секунду, не больше capacity
+
+    Полная корзина ничем не отличается от отсутствующей, поэтому раз в время
+    полного пополнения такие записи удаляются — словарь не растет с каждым
+    когда-либо написавшим пользователем.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        # ключ -> (токены, время обновления, отказов подряд)
+        self._buckets: Dict[Hashable, Tuple[float, float, int]] = {}
+        self._refill_time = capacity / rate
+        self._pruned = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, key: Hashable, now: float = None) -> bool:
+        """Списать токен; False, если лимит исчерпан"""
+        if now is None:
+            now = time.monotonic()
+        if now - self._pruned > self._refill_time:
+            self.prune(now)
+
+        tokens, updated, denied = self._buckets.get(key, (self.capacity, now, 0))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+            denied = 0
+        else:
+            denied += 1
+
+        self._buckets[key] = (tokens, now, denied)
+        return allowed
+
+    def denied(self, key: Hashable) -> int:
+        """Сколько запросов подряд отклонено (0 — последний разрешен)"""
+        return self._buckets.get(key, (0, 0, 0))[2]
+
+    def prune(self, now: float = None):
+        """Удалить корзины, успевшие пополниться до capacity"""
+        if now is None:
+            now = time.monotonic()
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rate < self.capacity
+        }
+        self._pruned = now
+
+
+def coalesce_key(update: Update) -> Optional[str]:
+    """Ключ для склейки одинаковых запросов: нажатие кнопки или команда
+
+    Обычный текст не склеивается: две одинаковые суммы подряд — это две записи.
+    """
+    if update.callback_query and update.callback_query.data:
+        return f"cb:{update.callback_query.data}"
+
+    message = update.message
+    if message and message.text and message.text.startswith('/'):
+        return f"cmd:{message.text}"
+
+    return None
+
+
+class UserUpdateProcessor(BaseUpdateProcessor):
+    """Обработка обновлений: последовательно для пользователя, параллельно между пользователями
+
+    • обновления одного пользователя выполняются строго по очереди, поэтому
+      context.user_data (amount, category_id, ...) не гоняется между обработчиками;
+    • повторное нажатие той же кнопки/команды, пока первое еще в работе,
+      не запускает второй расчет — пользователь получит ответ первого;
+    • token bucket на пользователя отсекает флуд до выполнения обработчиков.
+
+    Семафор PTB берется в process_update до do_process_update, и обновления,
+    ждущие блокировки своего пользователя, занимали бы общие слоты. Поэтому
+    PTB получает неограниченный лимит, а max_concurrent_updates ограничивает
+    только обработчики, которые уже дождались своей очереди.
+    """
+
+    def __init__(self, max_concurrent_updates: int = 64,
+                 rate_per_minute: float = 30, burst: int = 10):
+        super().__init__(sys.maxsize)
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self.bucket = TokenBucket(rate_per_minute / 60, burst)
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._pending: Dict[int, int] = {}
+        self._in_flight: Set[Tuple[int, str]] = set()
+        self.stats = {'processed': 0, 'coalesced': 0, 'throttled': 0}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            await coroutine
+            return
+
+        key = coalesce_key(update)
+        if key is not None and (user.id, key) in self._in_flight:
+            self.stats['coalesced'] += 1
+            await self._drop(update, coroutine)
+            return
+
+        if not self.bucket.allow(user.id):
+            self.stats['throttled'] += 1
+            # Сообщение о лимите — только на первый отказ подряд, иначе флуд получит ответ на каждое
+            notice = "⏳ Слишком много запросов, подождите немного" if self.bucket.denied(user.id) == 1 else None
+            await self._drop(update, coroutine, notice)
+            return
+
+        if key is not None:
+            self._in_flight.add((user.id, key))
+        lock = self._locks.setdefault(user.id, asyncio.Lock())
+        self._pending[user.id] = self._pending.get(user.id, 0) + 1
+
+        try:
+            async with lock, self._slots:
+                await coroutine
+            self.stats['processed'] += 1
+        finally:
+            if key is not None:
+                self._in_flight.discard((user.id, key))
+            self._pending[user.id] -= 1
+            if not self._pending[user.id]:
+                # Никто больше не ждет — не храним блокировку неактивного пользователя
+                del self._pending[user.id]
+                del self._locks[user.id]
+
+    @staticmethod
+    async def _drop(update: Update, coroutine: Awaitable, text: str = None):
+        """Отбросить обновление; нажатие кнопки все равно подтверждаем, на сообщение отвечаем text"""
+        coroutine.close()
+        try:
+            if update.callback_query:
+                await update.callback_query.answer(text)
+            elif text and update.effective_message:
+                await update.effective_message.reply_text(text)
+        except Exception as e:
+            logger.debug(f"Не удалось ответить на отброшенное обновление: {e}")
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
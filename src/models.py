@@ -1,8 +1,11 @@
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from typing import Optional
 
-@dataclass
+# Модели хранятся со __slots__: без __dict__ на каждый экземпляр,
+# поэтому тысячи строк из базы занимают заметно меньше памяти, чем dict(row)
+
+@dataclass(slots=True)
 class User:
     id: int
     telegram_id: int
@@ -10,13 +13,10 @@ class User:
     first_name: str
     language: str = 'ru'
     currency: str = 'RUB'
-    created_at: datetime = None
-    
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now()
+    created_at: Optional[datetime] = None
+    active_ledger_id: Optional[int] = None  # общий учет, в который пишет пользователь
 
-@dataclass
+@dataclass(slots=True)
 class Category:
     id: int
     name: str
@@ -24,7 +24,7 @@ class Category:
     type: str  # 'expense' or 'income'
     user_id: Optional[int] = None  # None для общих категорий
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     id: int
     user_id: int
@@ -33,8 +33,56 @@ class Transaction:
     description: Optional[str]
     type: str  # 'expense' or 'income'
     date: datetime
-    created_at: datetime = None
-    
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now()
\ No newline at end of file
+    created_at: Optional[datetime] = None
+    ledger_id: Optional[int] = None  # None — личная запись
+    # Поля из JOIN с categories
+    category_name: Optional[str] = None
+    category_emoji: Optional[str] = None
+    # Релевантность в результатах поиска (bm25, меньше — лучше)
+    score: Optional[float] = None
+
+@dataclass(slots=True)
+class RecurringRule:
+    id: int
+    user_id: int
+    category_id: int
+    amount: float
+    description: Optional[str]
+    type: str  # 'expense' or 'income'
+    interval: str  # 'daily', 'weekly' or 'monthly'
+    start_date: datetime
+    occurrences: int  # сколько записей уже создано
+    next_due: datetime
+    active: bool = True
+    ledger_id: Optional[int] = None
+    # Поля из JOIN с categories
+    category_name: Optional[str] = None
+    category_emoji: Optional[str] = None
+
+@dataclass(slots=True)
+class Ledger:
+    id: int
+    name: str
+    owner_id: int
+    invite_code: str
+    created_at: Optional[datetime] = None
+
+@dataclass(slots=True)
+class CategoryTotal:
+    name: str
+    emoji: str
+    total: float
+
+def columns(model, prefix: str = '') -> str:
+    """Список колонок для SELECT в порядке полей модели"""
+    return ', '.join(f'{prefix}{field.name}' for field in fields(model))
+
+def row_factory(model):
+    """row_factory для курсора: строка -> экземпляр модели
+
+    Колонки в SELECT должны идти в порядке полей модели (см. columns()),
+    тогда модель создается позиционно, без промежуточного dict.
+    """
+    def factory(cursor, row):
+        return model(*row)
+    return factory
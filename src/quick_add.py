@@ -0,0 +1,108 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from src.models import Category
+
+# "500 еда обед", "+30000 зарплата", "-250,50 такси"
+QUICK_ADD_RE = re.compile(r'^\s*([+-]?)\s*(\d+(?:[.,]\d{1,2})?)(?:\s+(.*))?$', re.DOTALL)
+
+# Минимальная длина префикса для поиска категории ("ед" -> "Еда")
+MIN_PREFIX = 2
+
+# Категория по умолчанию, если первое слово не похоже на категорию
+FALLBACK_CATEGORY = 'другое'
+
+
+def _strip_emoji_variation(text: str) -> str:
+    """Убрать variation selector, чтобы "✈️" и "✈" считались одним алиасом"""
+    return text.replace('\ufe0f', '')
+
+
+def parse_quick_entry(text: str) -> Optional[Tuple[str, float, str]]:
+    """Разбор сообщения быстрого ввода
+
+    Возвращает (тип, сумма, остаток текста) или None, если это не быстрый ввод.
+    Знак "+" означает доход, без знака или "-" — расход.
+    """
+    match = QUICK_ADD_RE.match(text)
+    if not match:
+        return None
+
+    sign, amount, rest = match.groups()
+    amount = float(amount.replace(',', '.'))
+    if amount <= 0:
+        return None
+
+    type_ = 'income' if sign == '+' else 'expense'
+    return type_, amount, (rest or '').strip()
+
+
+class CategoryIndex:
+    """Предвычисленный индекс алиасов категорий пользователя
+
+    Для каждой категории индексируются эмодзи, полное название и все его
+    префиксы от MIN_PREFIX символов. Префикс, общий для нескольких категорий,
+    не индексируется, если только он не совпадает с полным названием.
+    Категории различаются по (тип, название): одноименные строки — это одна
+    категория (берется первая), а не повод считать префикс неоднозначным.
+    """
+
+    def __init__(self, categories: List[Category]):
+        self.by_id = {c.id: c for c in categories}
+        self._aliases: Dict[str, Dict[str, Optional[Category]]] = {'expense': {}, 'income': {}}
+        exact: Dict[str, Dict[str, Category]] = {'expense': {}, 'income': {}}
+        prefixes: Dict[str, Dict[str, Optional[str]]] = {'expense': {}, 'income': {}}
+
+        for category in categories:
+            name = category.name.lower()
+            if name in exact[category.type]:
+                continue
+            exact[category.type][name] = category
+            exact[category.type].setdefault(_strip_emoji_variation(category.emoji), category)
+
+            owners = prefixes[category.type]
+            for length in range(MIN_PREFIX, len(name)):
+                prefix = name[:length]
+                owners[prefix] = name if owners.get(prefix, name) == name else None
+
+        for type_, owners in prefixes.items():
+            aliases = self._aliases[type_]
+            for prefix, name in owners.items():
+                aliases[prefix] = exact[type_][name] if name is not None else None
+            # Полные названия и эмодзи важнее неоднозначных префиксов
+            aliases.update(exact[type_])
+
+    def lookup(self, word: str, type_: str) -> Optional[Category]:
+        """Категория по слову (название, его начало или эмодзи)"""
+        return self._aliases[type_].get(_strip_emoji_variation(word.lower()))
+
+    def resolve(self, rest: str, type_: str) -> Tuple[Optional[Category], str]:
+        """Определить категорию по первому слову, вернуть (категория, описание)
+
+        Если первое слово не является категорией, используется "Другое",
+        а весь текст становится описанием.
+        """
+        first, _, description = rest.partition(' ')
+        category = self.lookup(first, type_) if first else None
+        if category is not None:
+            return category, description.strip()
+        return self._aliases[type_].get(FALLBACK_CATEGORY), rest
+
+
+# Кэш индексов по пользователю: категории меняются редко, а сообщений много
+_indexes: Dict[int, CategoryIndex] = {}
+
+
+def get_category_index(db, user_id: int) -> CategoryIndex:
+    """Индекс категорий пользователя (строится один раз)"""
+    index = _indexes.get(user_id)
+    if index is None:
+        index = _indexes[user_id] = CategoryIndex(db.get_categories(user_id=user_id))
+    return index
+
+
+def invalidate_category_index(user_id: int = None):
+    """Сбросить кэш индекса (после изменения категорий)"""
+    if user_id is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(user_id, None)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+DATE_FORMATS = ('%d.%m.%Y', '%d.%m.%y', '%d.%m')
+
+
+def parse_date(value: str) -> Optional[datetime]:
+    """Разбор даты в формате дд.мм[.гггг]"""
+    for fmt in DATE_FORMATS:
+        try:
+            date = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == '%d.%m':
+            date = date.replace(year=datetime.now().year)
+        return date
+    return None
+
+
+def parse_search_args(args: List[str]) -> dict:
+    """Разбор аргументов /search: текст запроса и фильтры
+    
+    Фильтры:
+    • #категория — только указанная категория (можно начало названия)
+    • с:дд.мм.гггг — начиная с даты
+    • по:дд.мм.гггг — по дату включительно
+    """
+    words = []
+    result = {'text': '', 'category': None, 'start_date': None, 'end_date': None}
+    
+    for arg in args:
+        lowered = arg.lower()
+        if arg.startswith('#') and len(arg) > 1:
+            result['category'] = lowered[1:]
+        elif lowered.startswith('с:') and parse_date(arg[2:]):
+            result['start_date'] = parse_date(arg[2:])
+        elif lowered.startswith('по:') and parse_date(arg[3:]):
+            # Включаем весь последний день
+            result['end_date'] = parse_date(arg[3:]) + timedelta(days=1) - timedelta(microseconds=1)
+        else:
+            words.append(arg)
+    
+    result['text'] = ' '.join(words)
+    return result
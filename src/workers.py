@@ -0,0 +1,235 @@
+"""Режим нескольких процессов: WORKERS=N python -m src.bot
+
+• главный процесс получает обновления (getUpdates) и раздает их воркерам;
+  пользователь всегда попадает в один и тот же воркер (консистентное
+  хеширование), поэтому его обновления обрабатываются по порядку, а
+  context.user_data живет в одном процессе;
+• воркеры — обычные Application с теми же обработчиками, каждый в своем
+  процессе со своим GIL; читают базу напрямую (WAL);
+• все записи выполняет один процесс записи (src.writer), объединяя
+  одновременные записи в общие транзакции.
+"""
+import os
+import signal
+import asyncio
+import logging
+import secrets
+import time
+import multiprocessing
+from bisect import bisect
+from hashlib import blake2b
+from typing import Hashable, Sequence
+
+from src.writer import start_writer
+
+logger = logging.getLogger(__name__)
+
+# Сколько точек на кольце у каждого воркера: чем больше, тем ровнее распределение
+RING_REPLICAS = 128
+
+# Сколько ждать готовности воркеров при старте, секунд
+STARTUP_TIMEOUT = 120
+
+# Как часто проверять, живы ли процессы, и не перезапускать упавший чаще, секунд
+SUPERVISE_INTERVAL = 1
+RESTART_DELAY = 5
+
+# Предельная пауза между повторами getUpdates при ошибках сети, секунд
+MAX_RETRY_INTERVAL = 30
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Консистентное хеширование ключей (id пользователя) по узлам (воркерам)
+
+    При изменении числа воркеров переезжает только ~1/N пользователей,
+    а не почти все, как при user_id % N.
+    """
+
+    def __init__(self, nodes: Sequence[Hashable], replicas: int = RING_REPLICAS):
+        points = sorted(
+            (_hash(f"{node}:{replica}"), node)
+            for node in nodes for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: Hashable) -> Hashable:
+        index = bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._nodes[index]
+
+
+def _worker_main(index: int, token: str, updates, ready, with_jobs: bool):
+    """Точка входа процесса-воркера"""
+    from src.bot import setup_logging
+
+    # Ctrl+C получает вся группа процессов; останавливает воркеры главный процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+    asyncio.run(_serve_worker(index, token, updates, ready, with_jobs))
+
+
+async def _serve_worker(index: int, token: str, updates, ready, with_jobs: bool):
+    from telegram import Update
+    from src.bot import build_application
+    from src.database import get_db
+
+    get_db()
+    app = build_application(token, jobs=with_jobs)
+    loop = asyncio.get_running_loop()
+
+    async with app:
+        await app.start()
+        ready.release()
+        logger.info(f"👷 Воркер {index} готов")
+
+        while True:
+            # Очередь multiprocessing блокирующая — ждем ее в потоке, остальное без ожидания
+            batch = [await loop.run_in_executor(None, updates.get)]
+            while batch[-1] is not None and not updates.empty():
+                batch.append(updates.get())
+
+            for data in batch:
+                if data is None:
+                    break
+                await app.update_queue.put(Update.de_json(data, app.bot))
+            if batch[-1] is None:
+                break
+
+        await app.stop()
+
+
+class _Workers:
+    """Процесс записи и воркеры с их очередями; упавший процесс запускается заново"""
+
+    def __init__(self, context, token: str, count: int):
+        self._context = context
+        self._token = token
+        self._db_name = os.getenv('DB_NAME', 'finance.db')
+        self._authkey = secrets.token_bytes(16)
+
+        self.writer, self._address = start_writer(context, self._db_name, self._authkey)
+        # Воркеры наследуют окружение и по нему подключают get_db() к процессу записи
+        os.environ['DB_WRITER_ADDRESS'] = self._address
+        os.environ['DB_WRITER_AUTHKEY'] = self._authkey.hex()
+
+        self.ready = context.Semaphore(0)
+        self.queues = [None] * count
+        self.processes = [None] * count
+        self._started = [0.0] * count
+        for index in range(count):
+            self._spawn(index)
+
+    def _spawn(self, index: int):
+        # Новая очередь: упавший процесс мог остаться владельцем блокировки чтения старой
+        self.queues[index] = self._context.Queue()
+        self.processes[index] = self._context.Process(
+            target=_worker_main,
+            # Задачи по расписанию — только в одном воркере
+            args=(index, self._token, self.queues[index], self.ready, index == 0),
+            name=f'worker-{index}'
+        )
+        self.processes[index].start()
+        self._started[index] = time.monotonic()
+
+    def revive(self):
+        """Перезапустить упавшие процессы (обновления в очередях упавших воркеров теряются)"""
+        if not self.writer.is_alive():
+            logger.error(f"💥 Процесс записи завершился (код {self.writer.exitcode}), перезапуск")
+            self.writer.join()
+            # Воркеры переподключатся к тому же адресу при следующей записи
+            self.writer, _ = start_writer(self._context, self._db_name, self._authkey, self._address)
+
+        for index, process in enumerate(self.processes):
+            if process.is_alive() or time.monotonic() - self._started[index] < RESTART_DELAY:
+                continue
+            logger.error(f"💥 Воркер {index} завершился (код {process.exitcode}), перезапуск")
+            process.join()
+            self._spawn(index)
+
+    def stop(self):
+        for updates in self.queues:
+            updates.put(None)
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+        # Все записи подтверждаются после COMMIT — после остановки воркеров ждать нечего
+        self.writer.terminate()
+        self.writer.join()
+
+
+async def _supervise(workers: _Workers):
+    """Перезапуск упавших процессов, пока идет получение обновлений"""
+    while True:
+        await asyncio.sleep(SUPERVISE_INTERVAL)
+        workers.revive()
+
+
+async def _dispatch(token: str, ring: HashRing, workers: _Workers):
+    """Получение обновлений и раздача воркерам
+
+    Ошибки сети при long polling обычны: повторяем так же, как Updater в PTB
+    (сразу после таймаута, с растущей паузой после прочих ошибок).
+    """
+    from telegram import Bot, Update
+    from telegram.error import InvalidToken, RetryAfter, TelegramError, TimedOut
+    from src.bot import bot_api_urls
+
+    bot = Bot(token, **bot_api_urls())
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass  # Windows: останавливаемся по Ctrl+C
+
+    supervisor = asyncio.create_task(_supervise(workers))
+    async with bot:
+        await bot.delete_webhook(drop_pending_updates=True)
+        offset = None
+        interval = 0
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=Update.ALL_TYPES)
+                interval = 0
+            except RetryAfter as e:
+                logger.warning(f"⏳ {e}")
+                interval = e.retry_after + 0.5
+            except TimedOut:
+                interval = 0
+            except InvalidToken:
+                raise
+            except TelegramError as e:
+                logger.error(f"❌ Ошибка получения обновлений: {e}")
+                interval = 1 if interval == 0 else min(MAX_RETRY_INTERVAL, interval * 1.5)
+            if interval:
+                await asyncio.sleep(interval)
+                continue
+
+            workers.revive()
+            for update in updates:
+                user = update.effective_user
+                workers.queues[ring.node_for(user.id if user else 0)].put(update.to_dict())
+                offset = update.update_id + 1
+
+
+def run_workers(token: str, workers: int):
+    """Запустить процесс записи, воркеры и раздачу обновлений (до Ctrl+C / SIGTERM)"""
+    # spawn: одинаково на Linux, macOS и Windows, без копии состояния главного процесса
+    context = multiprocessing.get_context('spawn')
+    pool = _Workers(context, token, workers)
+    try:
+        for _ in range(workers):
+            if not pool.ready.acquire(timeout=STARTUP_TIMEOUT):
+                raise RuntimeError("Воркеры не запустились")
+
+        logger.info(f"✅ Запущено воркеров: {workers}")
+        asyncio.run(_dispatch(token, HashRing(range(workers)), pool))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        logger.info("🛑 Остановка воркеров")
+        pool.stop()
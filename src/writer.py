@@ -0,0 +1,266 @@
+"""Процесс записи в базу для режима нескольких воркеров (см. src.workers)
+
+SQLite допускает одного пишущего за раз, поэтому все методы @writes из
+воркеров выполняются здесь, в одном потоке. Воркеры подключаются через
+multiprocessing.connection (Unix-сокет или именованный канал) и читают
+базу напрямую — в режиме WAL чтения не ждут записи.
+
+Запросы, накопившиеся за время предыдущего COMMIT, выполняются одним пакетом:
+каждый в своем SAVEPOINT (ошибка откатывает только его), затем один COMMIT.
+Ответ отправляется после COMMIT, поэтому подтвержденная запись уже на диске
+и видна воркеру при следующем чтении.
+"""
+import os
+import queue
+import signal
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional
+
+from src.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Максимум запросов в одном пакете (одной транзакции)
+MAX_BATCH = 512
+
+# Сигнал остановки потока записи
+_STOP = object()
+
+
+def _batchable(method: str) -> Optional[bool]:
+    """True/False для методов @writes (см. database.writes), None для остальных"""
+    return getattr(getattr(Database, method, None), 'batch', None)
+
+
+class WriteRequest:
+    __slots__ = ('method', 'args', 'kwargs', 'future')
+
+    def __init__(self, method: str, args: tuple, kwargs: dict):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+class WriterService:
+    """Очередь запросов на запись и поток, выполняющий их пакетами"""
+
+    def __init__(self, db: Database, max_batch: int = MAX_BATCH):
+        self.db = db
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self.stats = {'requests': 0, 'commits': 0}
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def submit(self, method: str, args: tuple = (), kwargs: dict = None) -> Future:
+        """Поставить вызов метода записи в очередь"""
+        request = WriteRequest(method, args, kwargs or {})
+        if _batchable(method) is None:
+            request.future.set_exception(AttributeError(f"{method} не является методом записи"))
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def _run(self):
+        carry = None
+        while True:
+            request = carry if carry is not None else self._queue.get()
+            carry = None
+            if request is _STOP:
+                return
+
+            # Методы со своим управлением транзакцией выполняются отдельно
+            if not _batchable(request.method):
+                self._execute_alone(request)
+                continue
+
+            # Все, что уже ждет в очереди, идет в тот же пакет — без искусственной задержки:
+            # под нагрузкой запросы копятся, пока идет предыдущий COMMIT
+            requests = [request]
+            while len(requests) < self.max_batch:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP or not _batchable(request.method):
+                    carry = request
+                    break
+                requests.append(request)
+
+            self._execute_batch(requests)
+
+    def _execute_batch(self, requests: List[WriteRequest]):
+        results = []
+        try:
+            with self.db.batch() as conn:
+                for request in requests:
+                    conn.execute('SAVEPOINT request')
+                    try:
+                        result = getattr(self.db, request.method)(*request.args, **request.kwargs)
+                        conn.execute('RELEASE request')
+                        results.append((request, result, None))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO request')
+                        conn.execute('RELEASE request')
+                        logger.error(f"Ошибка записи {request.method}: {e}")
+                        results.append((request, None, e))
+        except Exception as e:
+            # COMMIT не удался — не записан ни один запрос пакета
+            logger.error(f"❌ Ошибка пакета записи ({len(requests)} запросов): {e}")
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        self.stats['requests'] += len(requests)
+        self.stats['commits'] += 1
+        for request, result, error in results:
+            if error is None:
+                request.future.set_result(result)
+            else:
+                request.future.set_exception(error)
+
+    def _execute_alone(self, request: WriteRequest):
+        try:
+            result = getattr(self.db, request.method)(*request.args, **request.kwargs)
+        except Exception as e:
+            request.future.set_exception(e)
+        else:
+            self.stats['requests'] += 1
+            self.stats['commits'] += 1
+            request.future.set_result(result)
+
+    def serve_client(self, conn):
+        """Обслуживание одного воркера: запросы (id, метод, args, kwargs) -> ответы (id, ok, результат)"""
+        send_lock = threading.Lock()
+
+        def reply(request_id: int, future: Future):
+            error = future.exception()
+            message = (request_id, error is None, future.result() if error is None else error)
+            with send_lock:
+                try:
+                    conn.send(message)
+                except (OSError, ValueError) as e:
+                    logger.debug(f"Воркер отключился до ответа: {e}")
+                except Exception as e:
+                    # Результат или исключение не сериализуется — воркер не должен ждать вечно
+                    conn.send((request_id, False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+        try:
+            while True:
+                request_id, method, args, kwargs = conn.recv()
+                self.submit(method, args, kwargs).add_done_callback(
+                    lambda future, request_id=request_id: reply(request_id, future)
+                )
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+
+class WriterClient:
+    """Подключение воркера к процессу записи
+
+    Потокобезопасно: вызовы из разных потоков (asyncio.to_thread) отправляются
+    без ожидания друг друга, ответы сопоставляются по id запроса.
+    """
+
+    def __init__(self, address, authkey: bytes):
+        self._address = address
+        self._authkey = authkey
+        self._conn = None
+        self._send_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        with self._send_lock:
+            self._connect()
+
+    def _connect(self):
+        """Подключиться к процессу записи (под _send_lock)"""
+        self._conn = Client(self._address, authkey=self._authkey)
+        threading.Thread(target=self._receive, args=(self._conn,), name='db-writer-client',
+                         daemon=True).start()
+
+    def call(self, method: str, args: tuple = (), kwargs: dict = None):
+        """Выполнить метод записи и дождаться результата (исключение пробрасывается)"""
+        future = Future()
+        with self._send_lock:
+            if self._conn is None:
+                # Главный процесс перезапускает упавший процесс записи по тому же адресу
+                try:
+                    self._connect()
+                except OSError as e:
+                    raise ConnectionError("Процесс записи недоступен") from e
+                logger.info("🔌 Соединение с процессом записи восстановлено")
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            self._conn.send((request_id, method, args, kwargs or {}))
+        return future.result()
+
+    def _receive(self, conn):
+        try:
+            while True:
+                request_id, ok, result = conn.recv()
+                future = self._pending.pop(request_id)
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+        except (EOFError, OSError):
+            logger.error("❌ Соединение с процессом записи потеряно")
+            with self._send_lock:
+                self._conn = None
+                pending, self._pending = self._pending, {}
+            conn.close()
+            for future in pending.values():
+                future.set_exception(ConnectionError("Процесс записи недоступен"))
+
+
+def serve(db_name: str, authkey: bytes, ready, address=None):
+    """Точка входа процесса записи; адрес для подключения отправляется в ready
+
+    address задается при перезапуске: воркеры переподключаются по старому адресу.
+    """
+    from src.bot import setup_logging
+
+    # Ctrl+C останавливает главный процесс, он и завершит процесс записи
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+
+    service = WriterService(Database(db_name))
+    service.start()
+
+    if isinstance(address, str) and os.path.exists(address):
+        # Сокет упавшего процесса остался в файловой системе
+        os.unlink(address)
+
+    with Listener(address, authkey=authkey) as listener:
+        ready.send(listener.address)
+        ready.close()
+        logger.info(f"✍️ Процесс записи готов: {listener.address}")
+
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=service.serve_client, args=(conn,), daemon=True).start()
+
+
+def start_writer(context, db_name: str, authkey: bytes, address=None):
+    """Запустить процесс записи; возвращает (процесс, адрес)"""
+    parent, child = context.Pipe()
+    process = context.Process(target=serve, args=(db_name, authkey, child, address), name='db-writer')
+    process.start()
+    child.close()
+    try:
+        return process, parent.recv()
+    except EOFError:
+        raise RuntimeError("Процесс записи не запустился") from None